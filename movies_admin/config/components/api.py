@@ -0,0 +1,5 @@
+import os
+
+# Читать документы кинопроизведений из content.film_work_document
+# (обновляется командой refresh_film_documents), а не собирать их из связей.
+FILM_DOCUMENTS_FROM_TABLE = os.environ.get('FILM_DOCUMENTS_FROM_TABLE', 'False') == 'True'
@@ -0,0 +1,17 @@
+import os
+
+# Кэш документов кинопроизведений для API.
+# Для общего кэша нескольких процессов: 'movies.cache.DjangoCacheBackend' с OPTIONS {'alias': ...}.
+# Кэш в памяти сбрасывается сигналами только в своем процессе, поэтому
+# записи живут не дольше FILM_CACHE_TIMEOUT секунд.
+FILM_CACHE_BACKEND = os.environ.get('FILM_CACHE_BACKEND', 'movies.cache.LRUCacheBackend')
+FILM_CACHE = {
+    'BACKEND': FILM_CACHE_BACKEND,
+    'OPTIONS': {
+        'timeout': int(os.environ.get('FILM_CACHE_TIMEOUT', 60)),
+    },
+}
+if FILM_CACHE_BACKEND == 'movies.cache.LRUCacheBackend':
+    FILM_CACHE['OPTIONS']['max_entries'] = int(os.environ.get('FILM_CACHE_MAX_ENTRIES', 10_000))
+else:
+    FILM_CACHE['OPTIONS']['alias'] = os.environ.get('FILM_CACHE_ALIAS', 'default')
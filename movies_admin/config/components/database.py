@@ -1,5 +1,10 @@
 import os
 
+# Пул соединений psycopg_pool (Django 5.1+): DB_POOL=True.
+# Иначе соединение переиспользуется между запросами в течение DB_CONN_MAX_AGE секунд
+# и проверяется перед повторным использованием.
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -8,9 +13,23 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
         'PORT': os.environ.get('DB_PORT', 5432),
+        # С пулом соединения держит пул, CONN_MAX_AGE должен быть 0.
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
         'OPTIONS': {
             # Нужно явно указать схемы, с которыми будет работать приложение.
-            'options': '-c search_path=public,content'
+            'options': f"-c search_path={os.environ.get('DB_SEARCH_PATH', 'public,content')}",
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
         }
     }
-}
\ No newline at end of file
+}
+
+if DB_POOL:
+    # Параметры psycopg_pool.ConnectionPool.
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+    }
@@ -0,0 +1,11 @@
+import os
+
+# Замер SQL-запросов middleware movies.middleware.QueryInstrumentationMiddleware.
+# SAMPLE_RATE - доля замеряемых HTTP-запросов, N_PLUS_ONE_THRESHOLD - сколько раз
+# один нормализованный запрос может повториться, прежде чем запрос попадет в лог как N+1.
+SQL_INSTRUMENTATION = {
+    'ENABLED': os.environ.get('SQL_INSTRUMENTATION', 'True') == 'True',
+    'SAMPLE_RATE': float(os.environ.get('SQL_INSTRUMENTATION_SAMPLE_RATE', 0.1)),
+    'N_PLUS_ONE_THRESHOLD': int(os.environ.get('SQL_INSTRUMENTATION_N_PLUS_ONE', 10)),
+    'SERVER_TIMING': os.environ.get('SQL_INSTRUMENTATION_SERVER_TIMING', 'False') == 'True',
+}
@@ -0,0 +1,16 @@
+# Логи приложения movies: movies.sql - замеры SQL-запросов
+# (QueryInstrumentationMiddleware), movies.admin - ход массовых действий админки.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'movies.sql': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'movies.admin': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
@@ -4,6 +4,7 @@ from .settings import DEBUG
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/', include('movies.api.urls')),
 ]
 
 if DEBUG:
@@ -0,0 +1,248 @@
+import logging
+import time
+import uuid
+from typing import Callable, List
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from django.utils.translation import gettext, gettext_lazy as _
+
+from .cache import film_cache
+from .models import CustomTypeField, FilmWork, Genre, GenreFilmWork, Person, PersonFilmWork
+
+logger = logging.getLogger('movies.admin')
+
+# Сколько выбранных объектов обрабатывается одним запросом и одной транзакцией.
+CHUNK_SIZE = 1000
+
+
+class FilmWorkActionForm(ActionForm):
+    type = forms.ChoiceField(label=_('type'), choices=[('', '---------'), *CustomTypeField.choices], required=False)
+    genre = forms.ModelChoiceField(label=_('Genre'), queryset=Genre.objects.order_by('name'), required=False)
+
+
+class PersonActionForm(ActionForm):
+    merge_into = forms.UUIDField(label=_('merge into'), required=False,
+                                 help_text=_('id of the person to keep; by default the earliest created'))
+
+
+def table(model) -> str:
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def action_value(modeladmin, request, name: str):
+    """Функция возвращает проверенное значение поля action_form."""
+    return modeladmin.action_form.base_fields[name].clean(request.POST.get(name) or None)
+
+
+def run_in_chunks(modeladmin, request, queryset, apply: Callable[[object, List], int], done: str,
+                  **extra) -> None:
+    """Функция применяет apply к выбранным объектам пачками по CHUNK_SIZE id.
+
+    Пачки выбираются по возрастанию pk (keyset), поэтому выборка «все N
+    объектов» не загружается в память целиком, а удаленные строки не
+    сдвигают следующие пачки. Каждая пачка - отдельная транзакция, в
+    которой apply выполняет несколько запросов над массивом id и
+    возвращает число затронутых строк. Ход работы пишется в лог
+    movies.admin, итог - в сообщение админки.
+    """
+    queryset = queryset.prefetch_related(None).order_by('pk')
+    started = time.perf_counter()
+    processed = affected = chunks = 0
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        ids = list(page.values_list('pk', flat=True)[:CHUNK_SIZE])
+        if not ids:
+            break
+        with transaction.atomic(using=queryset.db), connections[queryset.db].cursor() as cursor:
+            affected += apply(cursor, ids)
+        processed += len(ids)
+        chunks += 1
+        last = ids[-1]
+        logger.info('%s: пачка %d, обработано %d, изменено строк %d',
+                    modeladmin.model._meta.model_name, chunks, processed, affected)
+    modeladmin.message_user(request, done % {
+        'processed': processed, 'affected': affected, 'chunks': chunks,
+        'seconds': time.perf_counter() - started, **extra,
+    }, messages.SUCCESS)
+
+
+def touch_films(cursor, film_ids: List) -> None:
+    """Функция отмечает фильмы измененными для refresh_film_documents и сбрасывает их документы в кэше."""
+    if not film_ids:
+        return
+    cursor.execute(f'UPDATE {table(FilmWork)} SET modified = now() WHERE id = ANY(%s::uuid[])', [film_ids])
+    transaction.on_commit(lambda: film_cache.invalidate_films(film_ids))
+
+
+def linked_films(cursor, link_model, column: str, ids: List) -> List:
+    cursor.execute(f'SELECT DISTINCT film_work_id FROM {table(link_model)} WHERE {column} = ANY(%s::uuid[])', [ids])
+    return [row[0] for row in cursor.fetchall()]
+
+
+@admin.action(description=_('Delete selected films with their links'), permissions=['delete'])
+def delete_films(modeladmin, request, queryset):
+    def apply(cursor, ids):
+        # Связи и документы удаляет ON DELETE CASCADE внешних ключей genre_film_work,
+        # person_film_work и film_work_document.
+        cursor.execute(f'DELETE FROM {table(FilmWork)} WHERE id = ANY(%s::uuid[])', [ids])
+        deleted = cursor.rowcount
+        transaction.on_commit(lambda: (film_cache.invalidate_films(ids), film_cache.invalidate_pages()))
+        return deleted
+
+    run_in_chunks(modeladmin, request, queryset, apply,
+                  gettext('Deleted films: %(affected)d (chunks: %(chunks)d, %(seconds).1f s).'))
+
+
+@admin.action(description=_('Delete selected genres with their links'), permissions=['delete'])
+def delete_genres(modeladmin, request, queryset):
+    def apply(cursor, ids):
+        films = linked_films(cursor, GenreFilmWork, 'genre_id', ids)
+        cursor.execute(f'DELETE FROM {table(Genre)} WHERE id = ANY(%s::uuid[])', [ids])
+        deleted = cursor.rowcount
+        touch_films(cursor, films)
+        return deleted
+
+    run_in_chunks(modeladmin, request, queryset, apply,
+                  gettext('Deleted genres: %(affected)d (chunks: %(chunks)d, %(seconds).1f s).'))
+
+
+@admin.action(description=_('Delete selected persons with their links'), permissions=['delete'])
+def delete_persons(modeladmin, request, queryset):
+    def apply(cursor, ids):
+        films = linked_films(cursor, PersonFilmWork, 'person_id', ids)
+        cursor.execute(f'DELETE FROM {table(Person)} WHERE id = ANY(%s::uuid[])', [ids])
+        deleted = cursor.rowcount
+        touch_films(cursor, films)
+        return deleted
+
+    run_in_chunks(modeladmin, request, queryset, apply,
+                  gettext('Deleted persons: %(affected)d (chunks: %(chunks)d, %(seconds).1f s).'))
+
+
+@admin.action(description=_('Change type of selected films'), permissions=['change'])
+def change_type(modeladmin, request, queryset):
+    try:
+        new_type = action_value(modeladmin, request, 'type')
+    except ValidationError:
+        new_type = None
+    if not new_type:
+        modeladmin.message_user(request, gettext('Choose a type.'), messages.WARNING)
+        return
+
+    def apply(cursor, ids):
+        changed = FilmWork.objects.filter(pk__in=ids).exclude(type=new_type).update(
+            type=new_type, modified=timezone.now())
+        transaction.on_commit(lambda: film_cache.invalidate_films(ids))
+        return changed
+
+    run_in_chunks(modeladmin, request, queryset, apply,
+                  gettext('Type changed for %(affected)d of %(processed)d films '
+                          '(chunks: %(chunks)d, %(seconds).1f s).'))
+
+
+def selected_genre(modeladmin, request):
+    try:
+        genre = action_value(modeladmin, request, 'genre')
+    except ValidationError:
+        genre = None
+    if genre is None:
+        modeladmin.message_user(request, gettext('Choose a genre.'), messages.WARNING)
+    return genre
+
+
+@admin.action(description=_('Attach genre to selected films'), permissions=['change'])
+def attach_genre(modeladmin, request, queryset):
+    genre = selected_genre(modeladmin, request)
+    if genre is None:
+        return
+
+    def apply(cursor, ids):
+        links = [GenreFilmWork(id=uuid.uuid4(), film_work_id=film_id) for film_id in ids]
+        cursor.execute(
+            f'INSERT INTO {table(GenreFilmWork)} (id, film_work_id, genre_id, created) '
+            f'SELECT link.id, link.film_work_id, %s::uuid, now() '
+            f'FROM unnest(%s::uuid[], %s::uuid[]) AS link(id, film_work_id) '
+            f'ON CONFLICT (film_work_id, genre_id) DO NOTHING RETURNING film_work_id',
+            [genre.pk, [link.id for link in links], [link.film_work_id for link in links]],
+        )
+        films = [row[0] for row in cursor.fetchall()]
+        transaction.on_commit(lambda: film_cache.invalidate_films(films))
+        return len(films)
+
+    run_in_chunks(modeladmin, request, queryset, apply,
+                  gettext('Genre attached to %(affected)d of %(processed)d films '
+                          '(chunks: %(chunks)d, %(seconds).1f s).'))
+
+
+@admin.action(description=_('Detach genre from selected films'), permissions=['change'])
+def detach_genre(modeladmin, request, queryset):
+    genre = selected_genre(modeladmin, request)
+    if genre is None:
+        return
+
+    def apply(cursor, ids):
+        cursor.execute(
+            f'DELETE FROM {table(GenreFilmWork)} WHERE genre_id = %s AND film_work_id = ANY(%s::uuid[]) '
+            f'RETURNING film_work_id',
+            [genre.pk, ids],
+        )
+        films = [row[0] for row in cursor.fetchall()]
+        touch_films(cursor, films)
+        return len(films)
+
+    run_in_chunks(modeladmin, request, queryset, apply,
+                  gettext('Genre detached from %(affected)d of %(processed)d films '
+                          '(chunks: %(chunks)d, %(seconds).1f s).'))
+
+
+@admin.action(description=_('Merge selected persons'), permissions=['change', 'delete'])
+def merge_persons(modeladmin, request, queryset):
+    """Сливает выбранных персон в одну: связи с фильмами переносятся, остальные персоны удаляются.
+
+    Если у оставляемой персоны или у нескольких сливаемых уже есть связь
+    с тем же фильмом в той же роли, остается одна связь - иначе
+    нарушился бы уникальный индекс (film_work_id, person_id, role).
+    """
+    try:
+        target_id = action_value(modeladmin, request, 'merge_into')
+    except ValidationError:
+        modeladmin.message_user(request, gettext('Enter a valid person id.'), messages.ERROR)
+        return
+    if target_id is None:
+        target_id = queryset.prefetch_related(None).order_by('created', 'pk').values_list('pk', flat=True).first()
+    elif not Person.objects.filter(pk=target_id).exists():
+        modeladmin.message_user(request, gettext('Person to merge into does not exist.'), messages.ERROR)
+        return
+    person_film_work = table(PersonFilmWork)
+
+    def apply(cursor, ids):
+        params = {'target': target_id, 'sources': ids}
+        cursor.execute(f"""
+            DELETE FROM {person_film_work} WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY film_work_id, role ORDER BY person_id = %(target)s DESC, created, id
+                    ) AS position
+                    FROM {person_film_work}
+                    WHERE person_id = %(target)s OR person_id = ANY(%(sources)s::uuid[])
+                ) ranked WHERE position > 1
+            ) RETURNING film_work_id
+        """, params)
+        films = {row[0] for row in cursor.fetchall()}
+        cursor.execute(f'UPDATE {person_film_work} SET person_id = %(target)s '
+                       f'WHERE person_id = ANY(%(sources)s::uuid[]) RETURNING film_work_id', params)
+        films.update(row[0] for row in cursor.fetchall())
+        cursor.execute(f'DELETE FROM {table(Person)} WHERE id = ANY(%(sources)s::uuid[])', params)
+        merged = cursor.rowcount
+        touch_films(cursor, list(films))
+        return merged
+
+    run_in_chunks(modeladmin, request, queryset.exclude(pk=target_id), apply,
+                  gettext('Merged persons: %(affected)d into %(target)s (chunks: %(chunks)d, %(seconds).1f s).'),
+                  target=target_id)
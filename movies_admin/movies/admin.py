@@ -1,31 +1,64 @@
 from django.contrib import admin
+from django.utils.translation import gettext_lazy as _
 
+from .actions import (FilmWorkActionForm, PersonActionForm, attach_genre, change_type, delete_films, delete_genres,
+                      delete_persons, detach_genre, merge_persons)
+from .formsets import PaginatedInlineMixin
 from .models import Genre, FilmWork, GenreFilmWork, Person, PersonFilmWork
+from .paginators import EstimatedCountPaginator
+from .search import TrigramSearchMixin
 
 
-class GenreFilmWorkInline(admin.TabularInline):
+class GenreFilmWorkInline(PaginatedInlineMixin, admin.TabularInline):
     model = GenreFilmWork
+    autocomplete_fields = ('genre',)
 
-class PersonFilmWorkInline(admin.TabularInline):
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('genre')
+
+
+class PersonFilmWorkInline(PaginatedInlineMixin, admin.TabularInline):
     model = PersonFilmWork
+    autocomplete_fields = ('person',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('person')
 
 
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
-    earch_fields = ('name',)
+    search_fields = ('name',)
+    actions = (delete_genres,)
 
 
 @admin.register(FilmWork)
-class FilmWorkAdmin(admin.ModelAdmin):
+class FilmWorkAdmin(TrigramSearchMixin, admin.ModelAdmin):
     inlines = (GenreFilmWorkInline, PersonFilmWorkInline)
 
-    list_display = ('title', 'type', 'creation_date', 'rating',)
+    list_display = ('title', 'type', 'creation_date', 'rating', 'get_genres',)
 
     list_filter = ('type','creation_date')
 
     search_fields = ('title', 'description', 'id')
 
+    # На больших таблицах количество строк оценивается, а не считается COUNT(*).
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # Групповые действия выполняются запросами над массивами id, а не по одному объекту.
+    actions = (delete_films, change_type, attach_genre, detach_genre)
+    action_form = FilmWorkActionForm
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('genres')
+
+    @admin.display(description=_('genres'))
+    def get_genres(self, obj):
+        return ', '.join(genre.name for genre in obj.genres.all())
+
 
 @admin.register(Person)
-class PersonAdmin(admin.ModelAdmin):
+class PersonAdmin(TrigramSearchMixin, admin.ModelAdmin):
     search_fields = ('full_name',)
+    actions = (delete_persons, merge_persons)
+    action_form = PersonActionForm
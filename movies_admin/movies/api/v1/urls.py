@@ -0,0 +1,10 @@
+from django.urls import path
+
+from movies.api.v1 import views
+
+urlpatterns = [
+    path('movies/', views.MoviesListApi.as_view()),
+    path('movies/<uuid:pk>/', views.MoviesDetailApi.as_view()),
+    path('movies/cache-stats/', views.CacheStatsApi.as_view()),
+    path('db-stats/', views.ConnectionStatsApi.as_view()),
+]
@@ -0,0 +1,138 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.views import View
+from django.views.generic.detail import BaseDetailView
+from django.views.generic.list import BaseListView
+
+from movies.cache import film_cache
+from movies.db import connection_stats
+from movies.models import FilmWork, FilmWorkDocument, RolesChoice
+from movies.search import escape_like
+
+FILM_FIELDS = ('id', 'title', 'description', 'creation_date', 'rating', 'type')
+ARRAY_FIELDS = ('genres', 'actors', 'producers', 'scenarists')
+
+
+def persons_by_role(role: str) -> ArrayAgg:
+    return ArrayAgg('personfilmwork__person__full_name', distinct=True, filter=Q(personfilmwork__role=role))
+
+
+def film_documents():
+    """Функция возвращает queryset кинопроизведений с жанрами и персонами по ролям.
+
+    Документы читаются из content.film_work_document, если это включено
+    в FILM_DOCUMENTS_FROM_TABLE, иначе все связи собираются одним запросом
+    через array_agg ... FILTER.
+    """
+    if settings.FILM_DOCUMENTS_FROM_TABLE:
+        return FilmWorkDocument.objects.values(*FILM_FIELDS, *ARRAY_FIELDS)
+    return FilmWork.objects.values(*FILM_FIELDS).annotate(
+        genres=ArrayAgg('genres__name', distinct=True),
+        actors=persons_by_role(RolesChoice.ACTOR),
+        producers=persons_by_role(RolesChoice.PRODUCER),
+        scenarists=persons_by_role(RolesChoice.SCENARIST),
+    )
+
+
+def serialize_film(film: dict) -> dict:
+    """Функция убирает NULL, которые array_agg дает для фильмов без связей."""
+    for field in ARRAY_FIELDS:
+        film[field] = [value for value in film[field] or () if value is not None]
+    return film
+
+
+def build_documents(film_ids: list) -> dict:
+    """Функция собирает документы фильмов одним запросом для кэша."""
+    return {film['id']: serialize_film(film) for film in film_documents().filter(id__in=film_ids)}
+
+
+class MoviesApiMixin:
+    model = FilmWork
+    http_method_names = ['get']
+
+    def get_queryset(self):
+        return film_documents()
+
+    def render_to_response(self, context, **response_kwargs):
+        return JsonResponse(context, json_dumps_params={'ensure_ascii': False}, **response_kwargs)
+
+
+class MoviesListApi(MoviesApiMixin, BaseListView):
+    """Список кинопроизведений с постраничным выводом по ключу.
+
+    Вместо OFFSET страница начинается после id из параметра cursor,
+    поэтому время ответа не зависит от номера страницы.
+    Параметр query ищет по названию через триграммный индекс.
+    """
+    paginate_by = 50
+    max_page_size = 100
+
+    def get(self, request, *args, **kwargs):
+        try:
+            self.cursor = uuid.UUID(request.GET['cursor']) if request.GET.get('cursor') else None
+            self.page_size = min(int(request.GET.get('page_size', self.paginate_by)), self.max_page_size)
+            self.query = request.GET.get('query', '').strip()
+        except ValueError:
+            return JsonResponse({'error': 'invalid cursor or page_size'}, status=400)
+        if self.page_size < 1:
+            return JsonResponse({'error': 'invalid cursor or page_size'}, status=400)
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, *, object_list=None, **kwargs):
+        if self.query:
+            # Результаты поиска не кэшируются: их состав меняется при любой правке названия.
+            film_ids = self.get_page_ids()
+        else:
+            film_ids = film_cache.get_page(self.cursor, self.page_size, self.get_page_ids)
+        has_next = len(film_ids) > self.page_size
+        film_ids = film_ids[:self.page_size]
+        return {
+            'next': str(film_ids[-1]) if has_next else None,
+            'results': film_cache.get_films(film_ids, build_documents),
+        }
+
+    def get_page_ids(self) -> list:
+        """Функция выбирает по индексу первичного ключа id фильмов страницы и одного следующего."""
+        model = FilmWorkDocument if settings.FILM_DOCUMENTS_FROM_TABLE else FilmWork
+        page_ids = model.objects.order_by('id').values_list('id', flat=True)
+        if self.query:
+            page_ids = page_ids.filter(title__ilike=f'%{escape_like(self.query)}%')
+        if self.cursor is not None:
+            page_ids = page_ids.filter(id__gt=self.cursor)
+        return list(page_ids[:self.page_size + 1])
+
+
+class MoviesDetailApi(MoviesApiMixin, BaseDetailView):
+
+    def get_object(self, queryset=None):
+        films = film_cache.get_films([self.kwargs['pk']], build_documents)
+        if not films:
+            raise Http404('Film work not found')
+        return films[0]
+
+    def get_context_data(self, **kwargs):
+        return self.object
+
+
+class CacheStatsApi(View):
+    """Счетчики попаданий, промахов и вытеснений кэша документов (только для персонала)."""
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'forbidden'}, status=403)
+        return JsonResponse(film_cache.stats())
+
+
+class ConnectionStatsApi(View):
+    """Статистика пула соединений с Postgres (только для персонала)."""
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'forbidden'}, status=403)
+        return JsonResponse(connection_stats())
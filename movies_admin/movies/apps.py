@@ -5,3 +5,6 @@ class MoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movies'
 
+    def ready(self):
+        from . import lookups, signals  # noqa: F401
+
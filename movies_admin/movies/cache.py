@@ -0,0 +1,170 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+FILM_KEY = 'film:{}'
+PAGE_KEY = 'page:{version}:{cursor}:{size}'
+PAGES_VERSION_KEY = 'pages-version'
+
+
+class LRUCacheBackend:
+    """Кэш в памяти процесса с вытеснением давно не использованных записей.
+
+    Сигналы сбрасывают записи только в своем процессе, поэтому записи
+    живут не дольше timeout секунд: другие процессы увидят изменения
+    не позже чем через timeout. None - хранить до вытеснения.
+    """
+
+    def __init__(self, max_entries: int = 10_000, timeout: Optional[float] = None):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and entry[0] <= now:
+                    del self._data[key]
+                    entry = None
+                if entry is not None:
+                    self._data.move_to_end(key)
+                    found[key] = entry[1]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def peek(self, key: str):
+        """Функция возвращает значение без учета в счетчиках попаданий и промахов."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    def set_many(self, values: dict) -> None:
+        expires = float('inf') if self.timeout is None else time.monotonic() + self.timeout
+        with self._lock:
+            for key, value in values.items():
+                self._data[key] = (expires, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._data), 'max_entries': self.max_entries, 'timeout': self.timeout}
+
+
+class DjangoCacheBackend:
+    """Адаптер к кэшу Django (например, общему Redis или Memcached).
+
+    Вытеснением управляет сам кэш, поэтому evictions здесь не считаются.
+    """
+
+    def __init__(self, alias: str = 'default', timeout: Optional[int] = None):
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_many(self, keys: Iterable[str]) -> dict:
+        keys = list(keys)
+        found = self.cache.get_many(keys)
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def peek(self, key: str):
+        """Функция возвращает значение без учета в счетчиках попаданий и промахов."""
+        return self.cache.get(key)
+
+    def set_many(self, values: dict) -> None:
+        self.cache.set_many(values, timeout=self.timeout)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        self.cache.delete_many(list(keys))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': None}
+
+
+class FilmDocumentCache:
+    """Кэш документов кинопроизведений по id и состава страниц списка.
+
+    Страница хранит только id фильмов, а документы берутся из кэша по id.
+    Поэтому правка жанра или персоны вытесняет только документы затронутых
+    фильмов, а страницы сбрасываются лишь при добавлении и удалении фильмов
+    сменой версии в ключе.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get_films(self, film_ids: List, build: Callable[[List], Dict]) -> List[dict]:
+        """Функция возвращает документы фильмов, собирая через build только отсутствующие в кэше."""
+        keys = {film_id: FILM_KEY.format(film_id) for film_id in film_ids}
+        found = self.backend.get_many(keys.values())
+        missing = [film_id for film_id, key in keys.items() if key not in found]
+        if missing:
+            built = build(missing)
+            self.backend.set_many({keys[film_id]: document for film_id, document in built.items()})
+            found.update((keys[film_id], document) for film_id, document in built.items())
+        return [found[key] for key in keys.values() if key in found]
+
+    def get_page(self, cursor, size: int, build: Callable[[], List]) -> List:
+        """Функция возвращает id фильмов страницы, начинающейся после cursor."""
+        key = PAGE_KEY.format(version=self._pages_version(), cursor=cursor, size=size)
+        found = self.backend.get_many([key])
+        if key in found:
+            return found[key]
+        page = build()
+        self.backend.set_many({key: page})
+        return page
+
+    def invalidate_films(self, film_ids: Iterable) -> None:
+        self.backend.delete_many(FILM_KEY.format(film_id) for film_id in film_ids)
+
+    def invalidate_pages(self) -> None:
+        self.backend.set_many({PAGES_VERSION_KEY: uuid.uuid4().hex})
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+    def _pages_version(self) -> str:
+        # Если версия вытеснена, создается новая: старые страницы становятся недоступны.
+        # Служебное чтение не учитывается в статистике кэша документов.
+        version = self.backend.peek(PAGES_VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            self.backend.set_many({PAGES_VERSION_KEY: version})
+        return version
+
+
+def create_film_cache() -> FilmDocumentCache:
+    config = getattr(settings, 'FILM_CACHE', {})
+    backend = import_string(config.get('BACKEND', 'movies.cache.LRUCacheBackend'))
+    return FilmDocumentCache(backend(**config.get('OPTIONS', {})))
+
+
+film_cache = create_film_cache()
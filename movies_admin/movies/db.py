@@ -0,0 +1,15 @@
+from django.db import connections
+
+
+def connection_stats(alias: str = 'default') -> dict:
+    """Функция возвращает состояние соединений с базой: статистику пула или настройки постоянных соединений."""
+    connection = connections[alias]
+    pool = getattr(connection, 'pool', None)
+    if pool is not None:
+        return {'mode': 'pool', 'name': pool.name, **pool.get_stats()}
+    return {
+        'mode': 'persistent' if connection.settings_dict['CONN_MAX_AGE'] else 'per-request',
+        'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+        'connected': connection.connection is not None,
+    }
@@ -0,0 +1,51 @@
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Инлайн-формсет, который показывает только одну страницу связанных строк.
+
+    Номер страницы берется из GET-параметра <prefix>-page, поэтому он
+    сохраняется и при отправке формы.
+    """
+    per_page = 20
+    request = None
+
+    @property
+    def page_param(self):
+        return f'{self.prefix}-page'
+
+    def get_queryset(self):
+        if not hasattr(self, 'page'):
+            queryset = super().get_queryset()
+            page_number = self.request.GET.get(self.page_param) if self.request is not None else None
+            self.paginator = Paginator(queryset, self.per_page)
+            self.page = self.paginator.get_page(page_number)
+        return self.page.object_list
+
+    def page_links(self):
+        """Функция возвращает ссылки на страницы: (номер, url, текущая ли страница)."""
+        self.get_queryset()
+        params = self.request.GET.copy() if self.request is not None else QueryDict(mutable=True)
+        links = []
+        for number in self.paginator.get_elided_page_range(self.page.number):
+            if number == self.paginator.ELLIPSIS:
+                links.append((number, None, False))
+                continue
+            params[self.page_param] = number
+            links.append((number, f'?{params.urlencode()}', number == self.page.number))
+        return links
+
+
+class PaginatedInlineMixin:
+    """Подключает постраничный вывод к InlineModelAdmin."""
+    formset = PaginatedInlineFormSet
+    per_page = 20
+    template = 'admin/movies/edit_inline/paginated_tabular.html'
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.request = request
+        formset.per_page = self.per_page
+        return formset
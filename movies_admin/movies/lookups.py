@@ -0,0 +1,16 @@
+from django.db.models import Lookup, TextField
+
+
+@TextField.register_lookup
+class ILike(Lookup):
+    """Регистронезависимый поиск через ILIKE.
+
+    В отличие от icontains (UPPER(col) LIKE UPPER(...)) условие ILIKE
+    по самому столбцу может использовать GIN-индекс pg_trgm.
+    """
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
@@ -0,0 +1,70 @@
+import json
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест списка кинопроизведений в админке по HTTP. '
+            'Запускается против работающего сервера, чтобы сравнить задержку '
+            'с пулом соединений (DB_POOL=True), постоянными соединениями и без них.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='адрес запущенного сервера')
+        parser.add_argument('--path', default='/admin/movies/filmwork/', help='проверяемая страница')
+        parser.add_argument('--requests', type=int, default=500, help='общее количество запросов')
+        parser.add_argument('--concurrency', type=int, default=10, help='количество одновременных клиентов')
+        parser.add_argument('--user', help='имя пользователя персонала (по умолчанию первый суперпользователь)')
+
+    def handle(self, *args, **options):
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self.staff_session(options["user"])}'
+        url = options['url'].rstrip('/')
+
+        def fetch(_) -> tuple:
+            request = urllib.request.Request(f"{url}{options['path']}", headers={'Cookie': cookie})
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                    status = response.status
+            except Exception:
+                status = None
+            return (time.perf_counter() - started) * 1000, status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(duration for duration, status in results if status == 200)
+        if not timings:
+            raise CommandError(f"Ни один запрос к {url}{options['path']} не завершился успешно")
+        p95 = timings[min(len(timings) - 1, round(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{len(timings)}/{len(results)} успешно, {len(results) / elapsed:.1f} запросов/с   "
+            f"p50 {statistics.median(timings):.1f} ms   p95 {p95:.1f} ms   max {timings[-1]:.1f} ms"
+        )
+
+        request = urllib.request.Request(f'{url}/api/v1/db-stats/', headers={'Cookie': cookie})
+        with urllib.request.urlopen(request) as response:
+            self.stdout.write(f'Соединения: {json.dumps(json.load(response), ensure_ascii=False)}')
+
+    @staticmethod
+    def staff_session(username) -> str:
+        """Функция создает сессию пользователя персонала и возвращает ее ключ."""
+        users = get_user_model().objects.filter(is_staff=True, is_active=True)
+        user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('Не найден пользователь персонала: создайте его через createsuperuser')
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session.session_key
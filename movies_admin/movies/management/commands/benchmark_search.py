@@ -0,0 +1,99 @@
+import random
+import statistics
+import time
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+
+from movies.admin import FilmWorkAdmin
+from movies.models import FilmWork
+from movies.paginators import EstimatedCountPaginator
+
+BENCH_PREFIX = 'bench:'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время поиска в админке кинопроизведений: стандартный поиск Django '
+            '(UPPER(...) LIKE) и поиск по триграммным индексам (ILIKE).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--films', type=int, default=1_000_000,
+                            help='сколько кинопроизведений должно быть в таблице')
+        parser.add_argument('--queries', type=int, default=50, help='количество поисковых запросов')
+        parser.add_argument('--keep', action='store_true', help='не удалять сгенерированные строки')
+
+    def handle(self, *args, **options):
+        generated = self.generate(options['films'])
+        try:
+            terms = self.sample_terms(options['queries'])
+            model_admin = FilmWorkAdmin(FilmWork, admin.site)
+            request = RequestFactory().get('/admin/movies/filmwork/')
+
+            def default_search(queryset, term):
+                return admin.ModelAdmin.get_search_results(model_admin, request, queryset, term)
+
+            def trigram_search(queryset, term):
+                return model_admin.get_search_results(request, queryset, term)
+
+            for name, search in (('django', default_search), ('trigram', trigram_search)):
+                timings = [self.measure(search, term, model_admin.list_per_page) for term in terms]
+                self.stdout.write(
+                    f'{name:<8} p50 {statistics.median(timings):8.1f} ms   '
+                    f'p95 {self.percentile(timings, 95):8.1f} ms   max {max(timings):8.1f} ms'
+                )
+        finally:
+            if generated and not options['keep']:
+                with connection.cursor() as cursor:
+                    cursor.execute('DELETE FROM content.film_work WHERE title LIKE %s', [f'{BENCH_PREFIX}%'])
+
+    def generate(self, films: int) -> int:
+        """Функция дополняет таблицу синтетическими кинопроизведениями до films строк."""
+        missing = films - FilmWork.objects.count()
+        if missing <= 0:
+            return 0
+        self.stdout.write(f'Генерация {missing} кинопроизведений...')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO content.film_work (id, title, description, type, created, modified)
+                SELECT gen_random_uuid(),
+                       %s || substr(md5(i::text), 1, 12) || ' ' || substr(md5((i * 7)::text), 1, 8),
+                       md5((i * 3)::text) || ' ' || md5((i * 5)::text),
+                       'MV', now(), now()
+                FROM generate_series(1, %s) AS i
+                """,
+                [BENCH_PREFIX, missing],
+            )
+            cursor.execute('ANALYZE content.film_work')
+        return missing
+
+    @staticmethod
+    def sample_terms(count: int) -> list:
+        """Функция выбирает поисковые строки из случайных названий и id."""
+        films = list(FilmWork.objects.order_by('?').values_list('id', 'title')[:count])
+        terms = []
+        for film_id, title in films:
+            if random.random() < 0.1:
+                terms.append(str(film_id))
+                continue
+            word = random.choice(title.split() or [title])
+            start = random.randrange(max(1, len(word) - 3))
+            terms.append(word[start:start + random.randint(3, 6)])
+        return terms
+
+    @staticmethod
+    def measure(search, term: str, per_page: int) -> float:
+        """Функция возвращает время получения первой страницы результатов в миллисекундах."""
+        started = time.perf_counter()
+        queryset, _ = search(FilmWork.objects.order_by('-id'), term)
+        paginator = EstimatedCountPaginator(queryset, per_page)
+        paginator.count
+        list(paginator.page(1).object_list)
+        return (time.perf_counter() - started) * 1000
+
+    @staticmethod
+    def percentile(values: list, percent: int) -> float:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, round(len(ordered) * percent / 100))]
@@ -0,0 +1,71 @@
+import datetime
+import json
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from movies.models import FilmWork, GenreFilmWork, PersonFilmWork
+
+INDEX_NODES = ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan')
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN ANALYZE для основных запросов к кинопроизведениям '
+            'и показывает, каким индексом пользуется каждый из них.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-seqscan', action='store_true',
+                            help='запретить планировщику Seq Scan, чтобы проверить индексы на маленькой базе')
+        parser.add_argument('--strict', action='store_true',
+                            help='завершиться с ошибкой, если хотя бы один запрос идет без индекса')
+        parser.add_argument('--verbose-plan', action='store_true', help='вывести планы целиком')
+
+    def handle(self, *args, **options):
+        without_index = []
+        with transaction.atomic():
+            if options['no_seqscan']:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in self.queries():
+                plan = json.loads(queryset.explain(format='json', analyze=True))[0]
+                indexes = sorted({f"{node['Node Type']} {node['Index Name']}"
+                                  for node in self.walk(plan['Plan']) if node['Node Type'] in INDEX_NODES})
+                if not indexes:
+                    without_index.append(name)
+                self.stdout.write(
+                    f"{name:<22} {plan['Execution Time']:9.2f} ms   "
+                    f"{', '.join(indexes) or 'без индекса'}"
+                )
+                if options['verbose_plan']:
+                    self.stdout.write(json.dumps(plan['Plan'], indent=2, ensure_ascii=False))
+
+        if without_index and options['strict']:
+            raise CommandError(f"Запросы без индекса: {', '.join(without_index)}")
+
+    @staticmethod
+    def queries() -> list:
+        """Функция возвращает проверяемые запросы с параметрами, взятыми из самих данных."""
+        creation_date = (FilmWork.objects.exclude(creation_date=None)
+                         .values_list('creation_date', flat=True).first() or datetime.date.today())
+        person_id = PersonFilmWork.objects.values_list('person_id', flat=True).first() or uuid.uuid4()
+        genre_id = GenreFilmWork.objects.values_list('genre_id', flat=True).first() or uuid.uuid4()
+        since = timezone.now() - datetime.timedelta(days=1)
+        return [
+            ('creation_date', FilmWork.objects.filter(
+                creation_date__gte=creation_date.replace(month=1, day=1),
+                creation_date__lt=creation_date.replace(year=creation_date.year + 1, month=1, day=1),
+            )),
+            ('order_by_rating', FilmWork.objects.exclude(rating=None).order_by('-rating')[:50]),
+            ('modified_since', FilmWork.objects.filter(modified__gt=since)),
+            ('films_of_person', FilmWork.objects.filter(personfilmwork__person_id=person_id)),
+            ('films_in_genre', FilmWork.objects.filter(genrefilmwork__genre_id=genre_id)),
+        ]
+
+    @classmethod
+    def walk(cls, node: dict):
+        yield node
+        for child in node.get('Plans', ()):
+            yield from cls.walk(child)
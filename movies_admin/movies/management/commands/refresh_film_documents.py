@@ -0,0 +1,118 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from movies.cache import film_cache
+from movies.models import RolesChoice
+
+# Сколько ключей документов сбрасывается в кэше одним запросом.
+INVALIDATE_CHUNK = 1000
+
+# Отметка прошлого обновления: время начала его транзакции (now()), то есть
+# момент до чтения данных. FOR UPDATE не дает двум обновлениям идти одновременно.
+WATERMARK_SQL = 'SELECT refreshed_at FROM content.film_work_document_refresh WHERE id = 1 FOR UPDATE'
+SAVE_WATERMARK_SQL = """
+    INSERT INTO content.film_work_document_refresh (id, refreshed_at) VALUES (1, now())
+    ON CONFLICT (id) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at
+"""
+
+# Фильмы, которые изменились сами или у которых изменились жанры, персоны или связи.
+TOUCHED_SQL = """
+    SELECT id FROM content.film_work WHERE modified > %(since)s
+    UNION
+    SELECT film_work_id FROM content.genre_film_work WHERE created > %(since)s
+    UNION
+    SELECT gfw.film_work_id FROM content.genre_film_work gfw
+    JOIN content.genre g ON g.id = gfw.genre_id WHERE g.modified > %(since)s
+    UNION
+    SELECT film_work_id FROM content.person_film_work WHERE created > %(since)s
+    UNION
+    SELECT pfw.film_work_id FROM content.person_film_work pfw
+    JOIN content.person p ON p.id = pfw.person_id WHERE p.modified > %(since)s
+"""
+
+REFRESH_SQL = """
+    INSERT INTO content.film_work_document
+        (id, title, description, creation_date, rating, type,
+         genres, actors, producers, scenarists, modified)
+    SELECT
+        fw.id, fw.title, fw.description, fw.creation_date, fw.rating, fw.type,
+        COALESCE(array_agg(DISTINCT g.name) FILTER (WHERE g.name IS NOT NULL), '{{}}'),
+        COALESCE(array_agg(DISTINCT p.full_name) FILTER (WHERE pfw.role = %(actor)s), '{{}}'),
+        COALESCE(array_agg(DISTINCT p.full_name) FILTER (WHERE pfw.role = %(producer)s), '{{}}'),
+        COALESCE(array_agg(DISTINCT p.full_name) FILTER (WHERE pfw.role = %(scenarist)s), '{{}}'),
+        now()
+    FROM content.film_work fw
+    LEFT JOIN content.genre_film_work gfw ON gfw.film_work_id = fw.id
+    LEFT JOIN content.genre g ON g.id = gfw.genre_id
+    LEFT JOIN content.person_film_work pfw ON pfw.film_work_id = fw.id
+    LEFT JOIN content.person p ON p.id = pfw.person_id
+    {where}
+    GROUP BY fw.id
+    ON CONFLICT (id) DO UPDATE SET
+        title = EXCLUDED.title,
+        description = EXCLUDED.description,
+        creation_date = EXCLUDED.creation_date,
+        rating = EXCLUDED.rating,
+        type = EXCLUDED.type,
+        genres = EXCLUDED.genres,
+        actors = EXCLUDED.actors,
+        producers = EXCLUDED.producers,
+        scenarists = EXCLUDED.scenarists,
+        modified = EXCLUDED.modified
+    RETURNING id
+"""
+
+
+class Command(BaseCommand):
+    help = ('Обновляет content.film_work_document только для кинопроизведений, '
+            'затронутых с прошлого обновления (по полям modified/created). '
+            'После загрузки из sqlite нужен --full: загрузчик сохраняет исходные modified и created, '
+            'которые старше отметки прошлого обновления.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='пересобрать все строки')
+        parser.add_argument('--overlap', type=int, default=300,
+                            help='запас в секундах на транзакции, зафиксированные во время прошлого обновления')
+
+    def handle(self, *args, **options):
+        params = {
+            'actor': RolesChoice.ACTOR,
+            'producer': RolesChoice.PRODUCER,
+            'scenarist': RolesChoice.SCENARIST,
+        }
+        started = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            since = None
+            cursor.execute(WATERMARK_SQL)
+            watermark = cursor.fetchone()
+            if not options['full'] and watermark is not None:
+                since = watermark[0] - timedelta(seconds=options['overlap'])
+
+            if since is None:
+                cursor.execute(REFRESH_SQL.format(where=''), params)
+            else:
+                params['since'] = since
+                cursor.execute(REFRESH_SQL.format(where=f'WHERE fw.id IN ({TOUCHED_SQL})'), params)
+            film_ids = [row[0] for row in cursor.fetchall()]
+            refreshed = len(film_ids)
+            cursor.execute(SAVE_WATERMARK_SQL)
+            # API с FILM_DOCUMENTS_FROM_TABLE собирает документы и страницы
+            # из этой таблицы: после фиксации сбрасываются переписанные
+            # документы и состав страниц, иначе в кэше остались бы собранные
+            # до обновления. Кэш в памяти других процессов эта команда
+            # не видит, там записи устаревают через FILM_CACHE_TIMEOUT.
+            if film_ids:
+                transaction.on_commit(lambda: self.invalidate_cache(film_ids))
+
+        elapsed = time.perf_counter() - started
+        scope = 'все' if since is None else f'измененные после {since:%Y-%m-%d %H:%M:%S%z}'
+        self.stdout.write(f'Обновлено документов: {refreshed} ({scope}) за {elapsed:.2f} с')
+
+    @staticmethod
+    def invalidate_cache(film_ids):
+        for start in range(0, len(film_ids), INVALIDATE_CHUNK):
+            film_cache.invalidate_films(film_ids[start:start + INVALIDATE_CHUNK])
+        film_cache.invalidate_pages()
@@ -0,0 +1,113 @@
+import json
+import logging
+import random
+import re
+import time
+from contextlib import ExitStack
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('movies.sql')
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+PLACEHOLDER_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACES = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """Функция приводит запрос к общему виду: литералы и параметры заменяются на ?, списки IN (...) сворачиваются."""
+    sql = LITERALS.sub('?', sql)
+    sql = PLACEHOLDER_LISTS.sub('(...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Обертка execute_wrapper, которая копит время и число запросов одного HTTP-запроса.
+
+    Во время запроса считаются только счетчики по исходному тексту SQL,
+    а нормализация выполняется один раз на каждый различный запрос в конце.
+    """
+    __slots__ = ('count', 'duration', 'by_sql', 'slowest', 'slowest_sql')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.by_sql = {}
+        self.slowest = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            self.by_sql[sql] = self.by_sql.get(sql, 0) + 1
+            if elapsed > self.slowest:
+                self.slowest, self.slowest_sql = elapsed, sql
+
+    def repeated(self, threshold: int) -> dict:
+        """Функция возвращает нормализованные запросы, выполненные больше threshold раз (признак N+1)."""
+        counts = {}
+        for sql, count in self.by_sql.items():
+            key = fingerprint(sql)
+            counts[key] = counts.get(key, 0) + count
+        return {sql: count for sql, count in counts.items() if count > threshold}
+
+
+class QueryInstrumentationMiddleware:
+    """Замеряет SQL-запросы выборки HTTP-запросов и пишет их в лог movies.sql.
+
+    Настраивается через SQL_INSTRUMENTATION в config/components/instrumentation.py.
+    """
+
+    def __init__(self, get_response):
+        config = getattr(settings, 'SQL_INSTRUMENTATION', {})
+        if not config.get('ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config.get('SAMPLE_RATE', 1.0)
+        self.n_plus_one_threshold = config.get('N_PLUS_ONE_THRESHOLD', 10)
+        self.server_timing = config.get('SERVER_TIMING', False)
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        repeated = recorder.repeated(self.n_plus_one_threshold)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 2),
+            'view_ms': round(total * 1000, 2),
+            'slowest_ms': round(recorder.slowest * 1000, 2),
+            'slowest_sql': fingerprint(recorder.slowest_sql) if recorder.slowest_sql else None,
+        }
+        if repeated:
+            record['n_plus_one'] = repeated
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={record["db_ms"]};desc="{recorder.count} queries", '
+                f'app;dur={round((total - recorder.duration) * 1000, 2)}, total;dur={record["view_ms"]}'
+            )
+        return response
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции.
+    atomic = False
+
+    dependencies = [
+        ('movies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS film_work_title_trgm_idx
+            ON content.film_work USING gin (title gin_trgm_ops);
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS content.film_work_title_trgm_idx;",
+        ),
+        migrations.RunSQL(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS film_work_description_trgm_idx
+            ON content.film_work USING gin (description gin_trgm_ops);
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS content.film_work_description_trgm_idx;",
+        ),
+        migrations.RunSQL(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS person_full_name_trgm_idx
+            ON content.person USING gin (full_name gin_trgm_ops);
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS content.person_full_name_trgm_idx;",
+        ),
+    ]
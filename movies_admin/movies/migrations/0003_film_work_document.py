@@ -0,0 +1,60 @@
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE TABLE IF NOT EXISTS content.film_work_document (
+                id uuid PRIMARY KEY REFERENCES content.film_work (id) ON DELETE CASCADE,
+                title TEXT NOT NULL,
+                description TEXT,
+                creation_date DATE,
+                rating FLOAT,
+                type TEXT NOT NULL,
+                genres TEXT[] NOT NULL DEFAULT '{}',
+                actors TEXT[] NOT NULL DEFAULT '{}',
+                producers TEXT[] NOT NULL DEFAULT '{}',
+                scenarists TEXT[] NOT NULL DEFAULT '{}',
+                modified timestamp with time zone NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS film_work_document_title_trgm_idx
+            ON content.film_work_document USING gin (title gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS film_work_document_genres_idx
+            ON content.film_work_document USING gin (genres);
+            CREATE INDEX IF NOT EXISTS film_work_document_creation_date_idx
+            ON content.film_work_document (creation_date);
+            CREATE INDEX IF NOT EXISTS film_work_document_rating_idx
+            ON content.film_work_document (rating);
+            CREATE INDEX IF NOT EXISTS film_work_document_modified_idx
+            ON content.film_work_document (modified);
+            """,
+            reverse_sql="DROP TABLE IF EXISTS content.film_work_document;",
+        ),
+        migrations.CreateModel(
+            name='FilmWorkDocument',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('title', models.TextField()),
+                ('description', models.TextField(null=True)),
+                ('creation_date', models.DateField(null=True)),
+                ('rating', models.FloatField(null=True)),
+                ('type', models.TextField()),
+                ('genres', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)),
+                ('actors', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)),
+                ('producers', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)),
+                ('scenarists', django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), size=None)),
+                ('modified', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'content"."film_work_document',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,188 @@
+import django.core.validators
+from django.db import migrations, models
+
+# Внешние ключи связующих таблиц: (таблица, колонка, таблица-родитель).
+FOREIGN_KEYS = [
+    ('genre_film_work', 'film_work_id', 'film_work'),
+    ('genre_film_work', 'genre_id', 'genre'),
+    ('person_film_work', 'film_work_id', 'film_work'),
+    ('person_film_work', 'person_id', 'person'),
+]
+
+# Пересоздает внешний ключ с ON DELETE CASCADE, как в movies_database.ddl,
+# если база была создана миграциями Django (без каскада на уровне БД).
+CASCADE_FOREIGN_KEY_SQL = """
+DO $$
+DECLARE
+    fk_name text;
+BEGIN
+    SELECT c.conname INTO fk_name
+    FROM pg_constraint c
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey)
+    WHERE c.contype = 'f'
+      AND c.conrelid = 'content.{table}'::regclass
+      AND a.attname = '{column}'
+      AND c.confdeltype <> 'c';
+    IF fk_name IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE content.{table} DROP CONSTRAINT %I', fk_name);
+        EXECUTE format(
+            'ALTER TABLE content.{table} ADD CONSTRAINT %I FOREIGN KEY ({column}) '
+            'REFERENCES content.{parent} (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED',
+            fk_name
+        );
+    END IF;
+END $$;
+"""
+
+ADD_CONSTRAINT_SQL = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}'
+                   AND conrelid = 'content.{table}'::regclass) THEN
+        ALTER TABLE content.{table} ADD CONSTRAINT {name} {definition};
+    END IF;
+END $$;
+"""
+
+
+class Migration(migrations.Migration):
+    """Приводит состояние моделей, миграции и movies_database.ddl к одной схеме.
+
+    База могла быть создана как DDL-файлом, так и миграцией 0001,
+    поэтому все изменения в БД выполняются идемпотентно (IF NOT EXISTS).
+    """
+
+    dependencies = [
+        ('movies', '0003_film_work_document'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='filmwork',
+                    name='file_path',
+                    field=models.FileField(blank=True, null=True, upload_to='movies/', verbose_name='file'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    "ALTER TABLE content.film_work ADD COLUMN IF NOT EXISTS file_path TEXT;",
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='filmwork',
+                    name='type',
+                    field=models.TextField(choices=[('MV', 'movie'), ('TV', 'tv_show')], default='MV',
+                                           verbose_name='type'),
+                ),
+                migrations.AlterField(
+                    model_name='filmwork',
+                    name='creation_date',
+                    field=models.DateField(blank=True, null=True, verbose_name='creation_date'),
+                ),
+                migrations.AlterField(
+                    model_name='filmwork',
+                    name='rating',
+                    field=models.FloatField(blank=True, null=True, verbose_name='rating',
+                                            validators=[django.core.validators.MinValueValidator(0),
+                                                        django.core.validators.MaxValueValidator(100)]),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    "ALTER TABLE content.film_work ALTER COLUMN type TYPE TEXT;",
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='filmwork',
+                    constraint=models.CheckConstraint(condition=models.Q(rating__gt=0, rating__lt=100),
+                                                      name='film_work_rating_check'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    ADD_CONSTRAINT_SQL.format(table='film_work', name='film_work_rating_check',
+                                              definition='CHECK (rating > 0 AND rating < 100)'),
+                    reverse_sql="ALTER TABLE content.film_work DROP CONSTRAINT IF EXISTS film_work_rating_check;",
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='genre',
+                    name='name',
+                    field=models.TextField(unique=True, verbose_name='name'),
+                ),
+                migrations.AlterField(
+                    model_name='genre',
+                    name='description',
+                    field=models.TextField(blank=True, null=True, verbose_name='description'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    "ALTER TABLE content.genre ALTER COLUMN name TYPE TEXT;"
+                    "ALTER TABLE content.genre ALTER COLUMN description DROP NOT NULL;",
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+                migrations.RunSQL(
+                    ADD_CONSTRAINT_SQL.format(table='genre', name='genre_name_key', definition='UNIQUE (name)'),
+                    reverse_sql="ALTER TABLE content.genre DROP CONSTRAINT IF EXISTS genre_name_key;",
+                ),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='personfilmwork',
+                    name='role',
+                    field=models.TextField(choices=[('AR', 'Actor'), ('PR', 'Producer'), ('ST', 'Scenarist')],
+                                           default='AR', verbose_name='role'),
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='genrefilmwork',
+                    constraint=models.UniqueConstraint(fields=('film_work_id', 'genre_id'),
+                                                       name='idx_genre_film_work_unique'),
+                ),
+                migrations.AddConstraint(
+                    model_name='personfilmwork',
+                    constraint=models.UniqueConstraint(fields=('film_work_id', 'person_id', 'role'),
+                                                       name='idx_person_film_work_unique'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_genre_film_work_unique "
+                    "ON content.genre_film_work (film_work_id, genre_id);",
+                    reverse_sql="DROP INDEX IF EXISTS content.idx_genre_film_work_unique;",
+                ),
+                migrations.RunSQL(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_person_film_work_unique "
+                    "ON content.person_film_work (film_work_id, person_id, role);",
+                    reverse_sql="DROP INDEX IF EXISTS content.idx_person_film_work_unique;",
+                ),
+            ],
+        ),
+        *(
+            migrations.RunSQL(
+                CASCADE_FOREIGN_KEY_SQL.format(table=table, column=column, parent=parent),
+                reverse_sql=migrations.RunSQL.noop,
+            )
+            for table, column, parent in FOREIGN_KEYS
+        ),
+    ]
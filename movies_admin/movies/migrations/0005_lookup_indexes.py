@@ -0,0 +1,68 @@
+from django.db import migrations, models
+
+# Индексы кинопроизведений: (имя, колонка). Нужны фильтру по дате в админке,
+# сортировке по рейтингу и инкрементальной выборке по modified.
+FILM_WORK_INDEXES = [
+    ('film_work_creation_date_idx', 'creation_date'),
+    ('film_work_rating_idx', 'rating'),
+    ('film_work_modified_idx', 'modified'),
+]
+
+# Индексы для обратных выборок «фильмы персоны» и «фильмы жанра»:
+# (имя, таблица, колонка). Если база создана миграцией 0001, Django уже
+# построил индексы по внешним ключам, и второй индекс не нужен.
+REVERSE_LOOKUP_INDEXES = [
+    ('person_film_work_person_id_idx', 'person_film_work', 'person_id'),
+    ('genre_film_work_genre_id_idx', 'genre_film_work', 'genre_id'),
+]
+
+INDEX_EXISTS_SQL = """
+    SELECT 1
+    FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+    WHERE i.indrelid = %s::regclass AND a.attname = %s
+"""
+
+
+def create_reverse_lookup_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for name, table, column in REVERSE_LOOKUP_INDEXES:
+            cursor.execute(INDEX_EXISTS_SQL, [f'content.{table}', column])
+            if cursor.fetchone() is None:
+                cursor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON content.{table} ({column})')
+
+
+def drop_reverse_lookup_indexes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for name, _, _ in REVERSE_LOOKUP_INDEXES:
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS content.{name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции.
+    atomic = False
+
+    dependencies = [
+        ('movies', '0004_schema_parity'),
+    ]
+
+    operations = [
+        *(
+            migrations.SeparateDatabaseAndState(
+                state_operations=[
+                    migrations.AddIndex(
+                        model_name='filmwork',
+                        index=models.Index(fields=[column], name=name),
+                    ),
+                ],
+                database_operations=[
+                    migrations.RunSQL(
+                        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON content.film_work ({column});',
+                        reverse_sql=f'DROP INDEX CONCURRENTLY IF EXISTS content.{name};',
+                    ),
+                ],
+            )
+            for name, column in FILM_WORK_INDEXES
+        ),
+        migrations.RunPython(create_reverse_lookup_indexes, drop_reverse_lookup_indexes),
+    ]
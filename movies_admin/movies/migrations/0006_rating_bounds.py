@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+# Границы рейтинга совпадают с MinValueValidator(0) и MaxValueValidator(100):
+# иначе full_clean() пропускал 0 и 100, а запись падала на CHECK.
+RATING_CHECK_SQL = """
+ALTER TABLE content.film_work DROP CONSTRAINT IF EXISTS film_work_rating_check;
+ALTER TABLE content.film_work ADD CONSTRAINT film_work_rating_check CHECK ({definition});
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveConstraint(
+                    model_name='filmwork',
+                    name='film_work_rating_check',
+                ),
+                migrations.AddConstraint(
+                    model_name='filmwork',
+                    constraint=models.CheckConstraint(condition=models.Q(rating__gte=0, rating__lte=100),
+                                                      name='film_work_rating_check'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    RATING_CHECK_SQL.format(definition='rating >= 0 AND rating <= 100'),
+                    reverse_sql=RATING_CHECK_SQL.format(definition='rating > 0 AND rating < 100'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_rating_bounds'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE TABLE IF NOT EXISTS content.film_work_document_refresh (
+                id smallint PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                refreshed_at timestamp with time zone NOT NULL
+            );
+            """,
+            reverse_sql="DROP TABLE IF EXISTS content.film_work_document_refresh;",
+        ),
+    ]
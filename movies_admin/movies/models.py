@@ -1,3 +1,4 @@
+from django.contrib.postgres.fields import ArrayField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -17,8 +18,8 @@ class CustomTypeField(models.TextChoices):
 
 
 class Genre(UUIDMixin, TimeStampedMixin):
-    name = models.TextField(verbose_name=_('name'))
-    description = models.TextField(verbose_name=_('description'), blank=True)
+    name = models.TextField(verbose_name=_('name'), unique=True)
+    description = models.TextField(verbose_name=_('description'), blank=True, null=True)
 
     class Meta:
         db_table = "content\".\"genre"
@@ -36,15 +37,24 @@ class FilmWork(UUIDMixin, TimeStampedMixin):
     rating = models.FloatField(verbose_name=_('rating'), blank=True, null=True,
                                validators=[MinValueValidator(0), MaxValueValidator(100)])
     file_path = models.FileField(blank=True, null=True, upload_to='movies/', verbose_name=_('file'))
-    type = models.CharField(
+    type = models.TextField(
         verbose_name=_('type'),
-        max_length=2,
         choices=CustomTypeField.choices,
         default=CustomTypeField.MOVIE,
     )
     genres = models.ManyToManyField(Genre, through='GenreFilmWork')
 
     class Meta:
+        constraints = [
+            # Те же границы рейтинга, что у валидаторов поля и в CHECK из movies_database.ddl
+            models.CheckConstraint(condition=models.Q(rating__gte=0, rating__lte=100),
+                                   name='film_work_rating_check'),
+        ]
+        indexes = [
+            models.Index(fields=['creation_date'], name='film_work_creation_date_idx'),
+            models.Index(fields=['rating'], name='film_work_rating_idx'),
+            models.Index(fields=['modified'], name='film_work_modified_idx'),
+        ]
         db_table = "content\".\"film_work"
         verbose_name = _('Film work')
         verbose_name_plural = _('Films')
@@ -61,7 +71,7 @@ class GenreFilmWork(UUIDMixin):
     class Meta:
         constraints = [
             # Создаем уникальное ограничение по полям film_work_id и genre_id
-            models.UniqueConstraint(fields=['film_work_id', 'genre_id'], name='unique_genre_film_work'),
+            models.UniqueConstraint(fields=['film_work_id', 'genre_id'], name='idx_genre_film_work_unique'),
         ]
         db_table = "content\".\"genre_film_work"
         verbose_name = _('Genre film work')
@@ -86,7 +96,7 @@ class Person(UUIDMixin, TimeStampedMixin):
 class PersonFilmWork(UUIDMixin):
     person = models.ForeignKey('Person', on_delete=models.CASCADE)
     film_work = models.ForeignKey('FilmWork', on_delete=models.CASCADE)
-    role = models.CharField(verbose_name=_('role'), choices=RolesChoice.choices, default=RolesChoice.ACTOR)
+    role = models.TextField(verbose_name=_('role'), choices=RolesChoice.choices, default=RolesChoice.ACTOR)
     created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -100,3 +110,28 @@ class PersonFilmWork(UUIDMixin):
 
     def __str__(self):
         return f"{_('Person')}: {self.person} {_('Film work')}: {self.film_work}"
+
+
+class FilmWorkDocument(models.Model):
+    """Денормализованная строка кинопроизведения для чтения каталога и поиска.
+
+    Таблица заполняется командой refresh_film_documents.
+    """
+    id = models.UUIDField(primary_key=True)
+    title = models.TextField()
+    description = models.TextField(null=True)
+    creation_date = models.DateField(null=True)
+    rating = models.FloatField(null=True)
+    type = models.TextField()
+    genres = ArrayField(models.TextField())
+    actors = ArrayField(models.TextField())
+    producers = ArrayField(models.TextField())
+    scenarists = ArrayField(models.TextField())
+    modified = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = "content\".\"film_work_document"
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,47 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который на больших таблицах не выполняет SELECT COUNT(*).
+
+    Без фильтров количество строк берется из pg_class.reltuples,
+    с фильтрами - из оценки планировщика (EXPLAIN). Если оценка меньше
+    порога, считается точное количество.
+    """
+    threshold = 10_000
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate_count()
+        if estimate is None or estimate < self.threshold:
+            return super().count
+        return estimate
+
+    def _estimate_count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [connection.ops.quote_name(queryset.model._meta.db_table)],
+                )
+                row = cursor.fetchone()
+                # До первого ANALYZE reltuples равен -1 (или 0 в старых версиях postgres).
+                return row[0] if row and row[0] > 0 else None
+
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return plan[0]['Plan']['Plan Rows']
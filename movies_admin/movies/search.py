@@ -0,0 +1,48 @@
+import uuid
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.text import smart_split, unescape_string_literal
+
+
+def escape_like(value: str) -> str:
+    """Функция экранирует спецсимволы шаблона LIKE."""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class TrigramSearchMixin:
+    """Поиск в админке по GIN-индексам pg_trgm.
+
+    Если строка поиска - UUID, ищется точное совпадение по первичному ключу.
+    Иначе каждое слово ищется через ILIKE '%слово%' по полям search_fields
+    (кроме id), что позволяет postgres использовать триграммные индексы.
+    На других СУБД используется стандартный поиск Django.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().get_search_results(request, queryset, search_term)
+
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        try:
+            return queryset.filter(pk=uuid.UUID(search_term)), False
+        except ValueError:
+            pass
+
+        search_fields = [field for field in self.get_search_fields(request) if field != 'id']
+        if not search_fields:
+            return queryset.none(), False
+
+        query = Q()
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            pattern = f'%{escape_like(bit)}%'
+            bit_query = Q()
+            for field in search_fields:
+                bit_query |= Q(**{f'{field}__ilike': pattern})
+            query &= bit_query
+        return queryset.filter(query), False
@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import film_cache
+from .models import FilmWork, Genre, GenreFilmWork, Person, PersonFilmWork
+
+
+def mark_films_modified(film_ids) -> None:
+    """Функция отмечает фильмы измененными одним запросом и сбрасывает их документы после фиксации.
+
+    От удаленной связи не остается строки с created, по которой
+    refresh_film_documents нашел бы фильм, поэтому отмечается сам фильм.
+    """
+    film_ids = list(film_ids)
+    if not film_ids:
+        return
+    FilmWork.objects.filter(pk__in=film_ids).update(modified=timezone.now())
+    transaction.on_commit(lambda: film_cache.invalidate_films(film_ids))
+
+
+def is_cascade(sender, origin) -> bool:
+    """Функция проверяет, удалена ли связь каскадом вместе с фильмом, жанром или персоной."""
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not sender
+
+
+@receiver(post_save, sender=FilmWork)
+@receiver(post_delete, sender=FilmWork)
+def invalidate_film(sender, instance, created=False, **kwargs):
+    # Сброс откладывается до фиксации транзакции: иначе параллельный запрос
+    # успел бы собрать документ из еще не зафиксированных данных и положить
+    # его в кэш.
+    film_ids = [instance.pk]
+    transaction.on_commit(lambda: film_cache.invalidate_films(film_ids))
+    # Состав страниц меняется только при добавлении или удалении фильма.
+    if created or kwargs['signal'] is post_delete:
+        transaction.on_commit(film_cache.invalidate_pages)
+
+
+@receiver(post_save, sender=GenreFilmWork)
+@receiver(post_save, sender=PersonFilmWork)
+def invalidate_film_relation(sender, instance, **kwargs):
+    film_ids = [instance.film_work_id]
+    transaction.on_commit(lambda: film_cache.invalidate_films(film_ids))
+
+
+@receiver(post_delete, sender=GenreFilmWork)
+@receiver(post_delete, sender=PersonFilmWork)
+def touch_unlinked_film(sender, instance, origin=None, **kwargs):
+    # Связи, удаленные каскадом, обрабатываются одним запросом в pre_delete
+    # жанра или персоны, а для удаляемого фильма - сигналами FilmWork.
+    if is_cascade(sender, origin):
+        return
+    mark_films_modified([instance.film_work_id])
+
+
+@receiver(pre_delete, sender=Genre)
+def touch_genre_films(sender, instance, **kwargs):
+    mark_films_modified(GenreFilmWork.objects.filter(genre_id=instance.pk).values_list('film_work_id', flat=True))
+
+
+@receiver(pre_delete, sender=Person)
+def touch_person_films(sender, instance, **kwargs):
+    mark_films_modified(PersonFilmWork.objects.filter(person_id=instance.pk)
+                        .values_list('film_work_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Genre)
+def invalidate_genre_films(sender, instance, **kwargs):
+    film_ids = list(GenreFilmWork.objects.filter(genre_id=instance.pk).values_list('film_work_id', flat=True))
+    transaction.on_commit(lambda: film_cache.invalidate_films(film_ids))
+
+
+@receiver(post_save, sender=Person)
+def invalidate_person_films(sender, instance, **kwargs):
+    film_ids = list(PersonFilmWork.objects.filter(person_id=instance.pk).values_list('film_work_id', flat=True))
+    transaction.on_commit(lambda: film_cache.invalidate_films(film_ids))
@@ -0,0 +1,94 @@
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .cache import LRUCacheBackend
+from .models import FilmWork, FilmWorkDocument, Genre, GenreFilmWork, Person, PersonFilmWork, RolesChoice
+
+
+class UnlinkRefreshTests(TestCase):
+    def setUp(self):
+        self.film = FilmWork.objects.create(title='Film', rating=5.0, type='movie')
+        self.genre = Genre.objects.create(name='Drama')
+        self.person = Person.objects.create(full_name='Actor')
+        GenreFilmWork.objects.create(film_work=self.film, genre=self.genre)
+        PersonFilmWork.objects.create(film_work=self.film, person=self.person, role=RolesChoice.ACTOR)
+        call_command('refresh_film_documents', '--full', stdout=StringIO())
+        # Документы собраны давно: обычное обновление смотрит только изменения после отметки.
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE content.film_work_document_refresh SET refreshed_at = %s',
+                           [timezone.now() - timedelta(hours=1)])
+        FilmWork.objects.update(modified=timezone.now() - timedelta(hours=2))
+
+    def refresh(self) -> FilmWorkDocument:
+        call_command('refresh_film_documents', '--overlap', '0', stdout=StringIO())
+        return FilmWorkDocument.objects.get(pk=self.film.pk)
+
+    def test_removed_link_refreshes_document(self):
+        GenreFilmWork.objects.get(film_work=self.film, genre=self.genre).delete()
+        self.assertEqual(self.refresh().genres, [])
+
+    def test_deleted_genre_refreshes_document(self):
+        self.genre.delete()
+        self.assertEqual(self.refresh().genres, [])
+
+    def test_deleted_person_refreshes_document(self):
+        self.person.delete()
+        self.assertEqual(self.refresh().actors, [])
+
+    def test_cascaded_links_touch_films_in_one_query(self):
+        films = [FilmWork.objects.create(title=f'Film {number}', rating=5.0) for number in range(5)]
+        for film in films:
+            PersonFilmWork.objects.create(film_work=film, person=self.person, role=RolesChoice.ACTOR)
+        FilmWork.objects.update(modified=timezone.now() - timedelta(hours=2))
+        with CaptureQueriesContext(connection) as queries:
+            self.person.delete()
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(FilmWork.objects.filter(modified__gt=timezone.now() - timedelta(minutes=1)).count(), 6)
+
+
+class LRUCacheBackendTests(SimpleTestCase):
+    def test_hits_misses_and_eviction(self):
+        backend = LRUCacheBackend(max_entries=2)
+        backend.set_many({'a': 1, 'b': 2})
+        self.assertEqual(backend.get_many(['a', 'c']), {'a': 1})
+        # 'b' давно не читался и вытесняется первым.
+        backend.set_many({'c': 3})
+        self.assertEqual(backend.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+        stats = backend.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['size']), (3, 2, 1, 2))
+
+    def test_timeout_expires_entries(self):
+        backend = LRUCacheBackend(timeout=0.05)
+        backend.set_many({'a': 1})
+        self.assertEqual(backend.get_many(['a']), {'a': 1})
+        time.sleep(0.1)
+        self.assertEqual(backend.get_many(['a']), {})
+        self.assertEqual(backend.stats()['size'], 0)
+
+    def test_peek_does_not_count(self):
+        backend = LRUCacheBackend()
+        backend.set_many({'a': 1})
+        self.assertEqual(backend.peek('a'), 1)
+        self.assertIsNone(backend.peek('b'))
+        self.assertEqual((backend.stats()['hits'], backend.stats()['misses']), (0, 0))
+
+
+class RatingBoundsTests(TestCase):
+    def test_bounds_are_valid(self):
+        for rating in (0, 100):
+            FilmWork(title='Film', rating=rating).full_clean()
+            FilmWork.objects.create(title=f'Film {rating}', rating=rating)
+
+    def test_out_of_range_is_field_error(self):
+        with self.assertRaises(ValidationError) as error:
+            FilmWork(title='Film', rating=100.5).full_clean()
+        self.assertIn('rating', error.exception.message_dict)
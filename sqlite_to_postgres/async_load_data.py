@@ -0,0 +1,263 @@
+"""Асинхронный перенос данных из SQLite в Postgres.
+
+SQLite читается и приводится к типам схем в отдельном потоке, пачки
+передаются через ограниченную asyncio.Queue, а запись идет через
+psycopg.AsyncConnection. Пока postgres фиксирует пачку, поток уже читает
+следующую; когда в очереди QUEUE_SIZE пачек, чтение ждет записи.
+
+Запуск (те же .env и флаги, что у load_data.py):
+
+    python async_load_data.py [--mode insert|copy] [--since MODIFIED|last] [--reset] [--queue N]
+"""
+import asyncio
+import itertools
+import sys
+import threading
+import time
+from dataclasses import fields
+from typing import Dict, Optional, Tuple
+
+import psycopg
+from psycopg import AsyncClientCursor, ClientCursor
+from psycopg.copy import AsyncLibpqWriter
+from psycopg.rows import dict_row
+
+from batching import BatchSizer
+from checkpoint import FINISH_SQL, SAVE_SQL, Checkpoint
+from config import *
+from dead_letter import DeadLetterFile
+from dedup import Deduplicator
+from load_data import (ROW_ERRORS, SAVEPOINT, TRANSIENT_ERRORS, PostgresSaver, SQLiteLoader, make_deduplicator,
+                       make_sizer, make_validator, open_db, parse_args, prepare_batches, prepare_checkpoints,
+                       report_metrics)
+from metrics import MigrationMetrics
+from schemas import pg_types, row_getter
+from validation import ReferenceValidator
+
+
+class AsyncCountingWriter(AsyncLibpqWriter):
+    """Писатель COPY, который считает отправленные в postgres байты."""
+
+    def __init__(self, cursor: psycopg.AsyncCursor):
+        super().__init__(cursor)
+        self.bytes_sent = 0
+
+    async def write(self, data) -> None:
+        self.bytes_sent += len(data)
+        await super().write(data)
+
+
+class AsyncPostgresSaver(PostgresSaver):
+    """Запись пачек из очереди через psycopg.AsyncConnection.
+
+    Запросы, обработка конфликтов, повторы и поиск отклоненных строк те же, что у PostgresSaver.
+    """
+
+    async def save_all_data(self, queue: asyncio.Queue) -> bool:
+        """Функция записывает пачки из очереди, пока не получит None.
+
+        Возвращает False, если запись прервалась из-за ошибки.
+        """
+        async with self.pg_conn.cursor() as cursor:
+            current_table, rows_count, started = None, 0, time.perf_counter()
+            while (batch := await queue.get()) is not None:
+                if isinstance(batch, Exception):
+                    logging.error(f"Чтение данных прервано: {batch}")
+                    return False
+                try:
+                    table_str = batch.get('table')
+                    rows = batch.get('data')
+
+                    if table_str != current_table:
+                        self._log_speed(current_table, rows_count, started)
+                        current_table, rows_count, started = table_str, 0, time.perf_counter()
+
+                    if batch.get('finished'):
+                        if self.checkpoints is not None:
+                            await cursor.execute(FINISH_SQL, (table_str,))
+                            await self.pg_conn.commit()
+                        continue
+
+                    write_started = time.perf_counter()
+                    written, bytes_sent, rejected = await self._save_batch(cursor=cursor, batch=batch)
+                    rows_count += len(rows)
+                    self._record_batch(batch, written, bytes_sent, time.perf_counter() - write_started, rejected)
+
+                except Exception as e:
+                    await self.pg_conn.rollback()
+                    logging.error(e)
+                    return False
+            self._log_speed(current_table, rows_count, started)
+            logging.info('Данные добавлены в бд.')
+            return True
+
+    async def _save_batch(self, cursor: psycopg.AsyncCursor, batch: dict) -> Tuple[int, int, int]:
+        """Функция записывает пачку и ее контрольную точку в одной транзакции, повторяя временные ошибки."""
+        table = batch['table']
+        for attempt in itertools.count():
+            rejected = []
+            try:
+                await cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+                written, bytes_sent = await self._write_isolated(cursor=cursor, table=table, schema=batch['schema'],
+                                                                 data=batch['data'], rejected=rejected)
+                if self.checkpoints is not None:
+                    await cursor.execute(SAVE_SQL, (table, batch.get('last_rowid'), batch.get('batch'),
+                                                    batch.get('last_modified')))
+                await self.pg_conn.commit()
+            except TRANSIENT_ERRORS as e:
+                if attempt >= self.retries or self.pg_conn.closed:
+                    raise
+                await self.pg_conn.rollback()
+                delay = self.retry_delay * 2 ** attempt
+                logging.warning(f"Таблица {table}, пачка {batch.get('batch')}: {e}. Повтор через {delay:.1f} с")
+                await asyncio.sleep(delay)
+                continue
+            if batch.get('orphan_rows'):
+                self.dead_letter.write(table, batch['orphan_rows'])
+            if rejected:
+                self.dead_letter.write(table, rejected)
+                logging.warning(f"Таблица {table}, пачка {batch.get('batch')}: отклонено строк {len(rejected)}")
+            return written, bytes_sent, len(rejected)
+
+    async def _write_isolated(self, cursor: psycopg.AsyncCursor, table: str, schema, data,
+                              rejected: list) -> Tuple[int, int]:
+        """Функция записывает строки внутри точки сохранения, деля пополам пачки с плохими строками."""
+        if not data:
+            return 0, 0
+        await cursor.execute(f'SAVEPOINT {SAVEPOINT}')
+        try:
+            written, bytes_sent = await self._write_batch(cursor=cursor, table=table, schema=schema, data=data)
+        except ROW_ERRORS as e:
+            await cursor.execute(f'ROLLBACK TO SAVEPOINT {SAVEPOINT}')
+            await cursor.execute(f'RELEASE SAVEPOINT {SAVEPOINT}')
+            if len(data) == 1:
+                rejected.append((data[0], e))
+                return 0, 0
+            middle = len(data) // 2
+            first = await self._write_isolated(cursor=cursor, table=table, schema=schema, data=data[:middle],
+                                               rejected=rejected)
+            second = await self._write_isolated(cursor=cursor, table=table, schema=schema, data=data[middle:],
+                                                rejected=rejected)
+            return first[0] + second[0], first[1] + second[1]
+        await cursor.execute(f'RELEASE SAVEPOINT {SAVEPOINT}')
+        return written, bytes_sent
+
+    async def _write_batch(self, cursor: psycopg.AsyncCursor, table: str, schema, data) -> Tuple[int, int]:
+        """Функция записывает пачку строк выбранным способом и возвращает число строк и байт."""
+        conflict = self._conflict_clause(table, schema)
+        if self.mode == 'copy':
+            return await self._copy_data(cursor=cursor, table=table, schema=schema, data=data, conflict=conflict)
+        query = self._creating_query(cursor=cursor, table=table, schema=schema, data=data, conflict=conflict)
+        await cursor.execute(query)
+        return cursor.rowcount, len(query.encode())
+
+    @staticmethod
+    async def _copy_data(cursor: psycopg.AsyncCursor, table: str, schema, data,
+                         conflict: str = 'ON CONFLICT (id) DO NOTHING') -> Tuple[int, int]:
+        """Функция записывает данные через бинарный COPY во временную таблицу."""
+        column_names_str = ', '.join(field.name for field in fields(schema))
+        staging = f'tmp_{table}'
+
+        await cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS {staging} '
+                             f'(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS')
+        # Без очистки при делении пачки пополам повторно вставились бы строки записанной части.
+        await cursor.execute(f'TRUNCATE {staging}')
+        values = row_getter(schema)
+        writer = AsyncCountingWriter(cursor)
+        async with cursor.copy(f'COPY {staging} ({column_names_str}) FROM STDIN (FORMAT BINARY)',
+                               writer=writer) as copy:
+            copy.set_types(pg_types(schema))
+            for row in data:
+                await copy.write_row(values(row))
+        await cursor.execute(f'INSERT INTO {table} ({column_names_str}) '
+                             f'SELECT {column_names_str} FROM {staging} {conflict}')
+        return cursor.rowcount, writer.bytes_sent
+
+
+def read_sqlite(file_name: str, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, stop: threading.Event,
+                progress: Dict[str, Checkpoint], since: Optional[str], sizer: BatchSizer,
+                readers: int = READERS, validator: Optional[ReferenceValidator] = None,
+                deduplicator: Optional[Deduplicator] = None) -> None:
+    """Функция читает sqlite в отдельном потоке и кладет пачки в очередь.
+
+    put ждет свободного места в очереди, так что чтение не уходит вперед
+    записи больше чем на maxsize пачек. В конце в очередь кладется None,
+    а при ошибке чтения перед ним - сама ошибка, чтобы запись вернула False.
+    """
+    def put(item) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    try:
+        with open_db(file_name=file_name) as sqlite_connect:
+            loader = SQLiteLoader(sqlite_connect, sizer=sizer, readers=readers)
+            data = loader.load_movies(checkpoints=progress, since=since)
+            for batch in prepare_batches(data, deduplicator, validator):
+                if stop.is_set():
+                    break
+                put(batch)
+    except Exception as e:
+        put(e)
+    finally:
+        put(None)
+
+
+async def async_load_from_sqlite(file_name: str, mode: str = WRITE_MODE, since: Optional[str] = None,
+                                 reset: bool = False, queue_size: int = QUEUE_SIZE,
+                                 metrics: Optional[MigrationMetrics] = None,
+                                 sizer: Optional[BatchSizer] = None,
+                                 dead_letter: Optional[DeadLetterFile] = None,
+                                 readers: int = READERS,
+                                 validator: Optional[ReferenceValidator] = None,
+                                 deduplicator: Optional[Deduplicator] = None, conflict: str = CONFLICT) -> bool:
+    """Основной метод асинхронной загрузки данных из SQLite в Postgres."""
+    started = time.perf_counter()
+    sizer = sizer or BatchSizer()
+    with psycopg.connect(**dsl, row_factory=dict_row, cursor_factory=ClientCursor) as pg_conn:
+        checkpoints, progress = prepare_checkpoints(pg_conn, reset=reset)
+        if validator is not None:
+            validator.seed(pg_conn)
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    reader = loop.run_in_executor(None, read_sqlite, file_name, queue, loop, stop, progress, since,
+                                  sizer, readers, validator, deduplicator)
+
+    saved = False
+    try:
+        async with await psycopg.AsyncConnection.connect(
+                **dsl, row_factory=dict_row, cursor_factory=AsyncClientCursor
+        ) as pg_conn:
+            postgres_saver = AsyncPostgresSaver(pg_conn, mode=mode, checkpoints=checkpoints,
+                                                upsert=since is not None, metrics=metrics, sizer=sizer,
+                                                dead_letter=dead_letter, conflict=conflict)
+            saved = await postgres_saver.save_all_data(queue)
+    finally:
+        if not saved:
+            # Останавливаем чтение и разбираем очередь, чтобы поток не ждал места в ней.
+            stop.set()
+            while await queue.get() is not None:
+                pass
+        await reader
+
+    logging.info(f"Асинхронный перенос ({mode}, очередь {queue_size}) за {time.perf_counter() - started:.2f} с")
+    return saved
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    metrics = MigrationMetrics(jsonl_path=args.metrics, prometheus_path=args.prometheus)
+    sizer = make_sizer(args)
+    dead_letter = DeadLetterFile(args.dead_letter)
+    validator = make_validator(args)
+    deduplicator = make_deduplicator(args)
+    saved = False
+    try:
+        saved = asyncio.run(async_load_from_sqlite(file_name='db.sqlite', mode=args.mode, since=args.since,
+                                                   reset=args.reset, queue_size=args.queue, metrics=metrics,
+                                                   sizer=sizer, dead_letter=dead_letter, readers=args.readers,
+                                                   validator=validator, deduplicator=deduplicator,
+                                                   conflict=args.conflict))
+    finally:
+        report_metrics(metrics, dead_letter, validator, deduplicator)
+    sys.exit(0 if saved else 1)
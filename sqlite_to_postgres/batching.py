@@ -0,0 +1,55 @@
+from typing import Dict, Optional
+
+from config import BATCH_MAX, BATCH_MAX_MB, BATCH_MIN, BATCH_TARGET_SECONDS, READ_SIZE, WRITE_SIZE
+
+
+class BatchSizer:
+    """Выбирает размер пачки записи в postgres для каждой таблицы.
+
+    Чтение из sqlite всегда идет по read_size строк, прочитанные строки
+    копятся до размера пачки записи.
+
+    Без adaptive размер постоянный: sizes[table] или size. В режиме adaptive
+    загрузка начинается с sizes[table] или min_size, и после каждой пачки размер удваивается,
+    если commit занял меньше половины target_seconds, и уменьшается вдвое,
+    если дольше target_seconds. Сверху размер ограничен max_size и объемом
+    пачки max_mb: по отправленным байтам оценивается средняя длина строки,
+    поэтому у широких строк film_work пачка меньше, чем у genre_film_work.
+    """
+
+    def __init__(self, read_size: int = READ_SIZE, size: int = WRITE_SIZE, sizes: Optional[Dict[str, int]] = None,
+                 adaptive: bool = False, min_size: int = BATCH_MIN, max_size: int = BATCH_MAX,
+                 target_seconds: float = BATCH_TARGET_SECONDS, max_mb: float = BATCH_MAX_MB):
+        self.read_size = read_size
+        self.adaptive = adaptive
+        self.initial = min_size if adaptive else size
+        self.sizes = dict(sizes or {})
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.max_bytes = int(max_mb * 2 ** 20)
+
+    def size(self, table: str) -> int:
+        """Функция возвращает текущий размер пачки таблицы."""
+        return self.sizes.get(table, self.initial)
+
+    def observe(self, table: str, rows: int, seconds: float, bytes_sent: int) -> None:
+        """Функция пересчитывает размер пачки по времени записи и объему последней пачки."""
+        if not self.adaptive or not rows:
+            return
+        size = self.size(table)
+        if seconds > self.target_seconds:
+            size //= 2
+        elif seconds < self.target_seconds / 2 and rows >= size:
+            size *= 2
+        memory_limit = self.max_bytes * rows // bytes_sent if bytes_sent else self.max_size
+        self.sizes[table] = max(self.min_size, min(size, self.max_size, memory_limit))
+
+
+def parse_sizes(value: Optional[str]) -> Dict[str, int]:
+    """Функция разбирает размеры пачек по таблицам из строки вида 'film_work=500,genre_film_work=5000'."""
+    sizes = {}
+    for item in filter(None, (value or '').split(',')):
+        table, _, size = item.partition('=')
+        sizes[table.strip()] = int(size)
+    return sizes
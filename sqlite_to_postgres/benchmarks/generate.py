@@ -0,0 +1,156 @@
+"""Генератор синтетической базы sqlite с таблицами кинотеки.
+
+Таблицы и порядок колонок совпадают со схемами из schemas, поэтому базу
+можно загружать тем же загрузчиком, что и настоящий db.sqlite.
+Размер задается количеством строк в связующих таблицах, на каждый фильм
+приходится 1-4 жанра и 4-20 персон.
+
+Запуск из каталога sqlite_to_postgres:
+
+    python -m benchmarks.generate bench.sqlite --size 1m
+"""
+import argparse
+import random
+import sqlite3
+import uuid
+from dataclasses import fields
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List
+
+from schemas import SQLITE_TYPES, FilmWork, Genre, GenreFilmWork, Person, PersonFilmWork
+
+# Количество строк в связующих таблицах для готовых размеров.
+SIZES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+TABLES = [
+    ('genre', Genre),
+    ('person', Person),
+    ('film_work', FilmWork),
+    ('genre_film_work', GenreFilmWork),
+    ('person_film_work', PersonFilmWork),
+]
+
+GENRES_COUNT = 30
+GENRES_PER_FILM = (1, 4)
+PERSONS_PER_FILM = (4, 20)
+PERSONS_PER_FILM_SHARE = 2
+ROLES = ['actor'] * 8 + ['director', 'writer']
+TYPES = ['movie'] * 4 + ['tv_show']
+CHUNK = 10_000
+EPOCH = datetime(2021, 6, 16, tzinfo=timezone.utc)
+
+
+def create_tables(cursor: sqlite3.Cursor) -> None:
+    """Функция создает таблицы с колонками в порядке полей схем."""
+    for table, schema in TABLES:
+        columns = ', '.join(
+            f"{field.name} {SQLITE_TYPES.get(field.type, 'TEXT')}{' PRIMARY KEY' if field.name == 'id' else ''}"
+            for field in fields(schema)
+        )
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"CREATE TABLE {table} ({columns})")
+
+
+def timestamp(rnd: random.Random) -> str:
+    """Функция возвращает метку времени в формате выгрузки sqlite."""
+    value = EPOCH + timedelta(seconds=rnd.randrange(86400 * 365), microseconds=rnd.randrange(1_000_000))
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f') + '+00'
+
+
+def new_id(rnd: random.Random) -> str:
+    return str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+
+
+def chunked(rows: Iterator[tuple], size: int = CHUNK) -> Iterator[List[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def insert(cursor: sqlite3.Cursor, table: str, rows: Iterator[tuple]) -> int:
+    """Функция записывает строки пачками и возвращает их количество."""
+    count = 0
+    for chunk in chunked(rows):
+        cursor.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(chunk[0]))})", chunk)
+        count += len(chunk)
+    return count
+
+
+def generate(file_name: str, link_rows: int, seed: int = 0) -> dict:
+    """Функция заполняет базу так, чтобы в связующих таблицах было около link_rows строк.
+
+    Возвращает количество строк в каждой таблице.
+    """
+    rnd = random.Random(seed)
+    avg_links = sum(GENRES_PER_FILM) / 2 + sum(PERSONS_PER_FILM) / 2
+    films_count = max(1, round(link_rows / avg_links))
+    persons_count = max(PERSONS_PER_FILM[1], films_count * PERSONS_PER_FILM_SHARE)
+
+    genres = [new_id(rnd) for _ in range(GENRES_COUNT)]
+    persons = [new_id(rnd) for _ in range(persons_count)]
+    films = [new_id(rnd) for _ in range(films_count)]
+
+    def film_rows():
+        for film_id in films:
+            yield (film_id, f'Film {film_id[:8]}', f'Description of film {film_id}',
+                   f'{rnd.randint(1950, 2021)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}',
+                   None, round(rnd.uniform(1, 99), 1), rnd.choice(TYPES), timestamp(rnd), timestamp(rnd))
+
+    def genre_film_rows():
+        for film_id in films:
+            for genre_id in rnd.sample(genres, rnd.randint(*GENRES_PER_FILM)):
+                yield new_id(rnd), film_id, genre_id, timestamp(rnd)
+
+    def person_film_rows():
+        for film_id in films:
+            for person_id in rnd.sample(persons, rnd.randint(*PERSONS_PER_FILM)):
+                yield new_id(rnd), film_id, person_id, rnd.choice(ROLES), timestamp(rnd)
+
+    conn = sqlite3.connect(file_name)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        cursor = conn.cursor()
+        create_tables(cursor)
+        counts = {
+            'genre': insert(cursor, 'genre', ((genre_id, f'Genre {n}', None, timestamp(rnd), timestamp(rnd))
+                                              for n, genre_id in enumerate(genres))),
+            'person': insert(cursor, 'person', ((person_id, f'Person {person_id[:8]}', timestamp(rnd), timestamp(rnd))
+                                                for person_id in persons)),
+            'film_work': insert(cursor, 'film_work', film_rows()),
+            'genre_film_work': insert(cursor, 'genre_film_work', genre_film_rows()),
+            'person_film_work': insert(cursor, 'person_film_work', person_film_rows()),
+        }
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
+def parse_size(value: str) -> int:
+    return SIZES[value] if value in SIZES else int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генерация синтетической базы sqlite.')
+    parser.add_argument('file_name', help='путь к создаваемой базе')
+    parser.add_argument('--size', type=parse_size, default=SIZES['10k'],
+                        help=f"строк в связующих таблицах: {', '.join(SIZES)} или число")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for table, count in generate(args.file_name, args.size, seed=args.seed).items():
+        print(f'{table}: {count}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Сквозной бенчмарк переноса данных из sqlite в postgres.
+
+Перенос идет тем же путем, что и load_data.py: load_from_sqlite с
+контрольными точками, BatchSizer, проверкой ссылок и удалением дублей.
+Время чтения из sqlite, приведения типов и записи в postgres по каждой
+таблице берется из MigrationMetrics, к нему добавляются строки в секунду
+и пиковый RSS процесса. Результаты сохраняются в JSON, чтобы сравнивать
+их между релизами.
+
+Запуск из каталога sqlite_to_postgres (база postgres берется из .env):
+
+    python -m benchmarks.migration --size 1m --mode copy --truncate --output bench.json
+
+Контрольные точки сбрасываются перед каждым прогоном, но без --truncate
+повторные прогоны упираются в ON CONFLICT и почти ничего не пишут,
+поэтому бенчмарк нужно запускать на отдельной базе.
+С --no-write postgres не нужен: пачки SQLiteLoader только читаются
+и приводятся к схемам.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import psycopg
+from psycopg import ClientCursor
+from psycopg.rows import dict_row
+
+from batching import BatchSizer, parse_sizes
+from benchmarks.generate import SIZES, generate, parse_size
+from config import BATCH_ADAPTIVE, READERS, WRITE_MODE, WRITE_MODES, WRITE_SIZES, dsl
+from load_data import PostgresSaver, SQLiteLoader, load_from_sqlite
+from metrics import MigrationMetrics
+from sqlite_reader import connect_sqlite
+
+
+def peak_rss_mb() -> float:
+    """Функция возвращает пиковый RSS процесса в мегабайтах."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS в байтах.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def current_rss_mb() -> float:
+    """Функция возвращает текущий RSS процесса в мегабайтах.
+
+    Текущий RSS есть только в /proc/self/status, на других системах
+    возвращается пиковый.
+    """
+    try:
+        with open('/proc/self/status', encoding='ascii') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+class TableMemoryMetrics(MigrationMetrics):
+    """Метрики переноса с замером памяти по таблицам.
+
+    После каждой пачки снимается текущий RSS процесса, а при trace_memory
+    еще и пик tracemalloc с прошлой пачки, после чего пик сбрасывается:
+    память, выделенная между двумя пачками, уходит на чтение, приведение
+    и запись последней из них. При параллельной загрузке таблиц их пики
+    смешиваются.
+    """
+
+    def __init__(self, trace_memory: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.trace_memory = trace_memory
+        self.memory = {}
+        self._last_rss = current_rss_mb()
+        if trace_memory:
+            tracemalloc.start()
+
+    def record_batch(self, table: str, **kwargs) -> None:
+        super().record_batch(table=table, **kwargs)
+        rss = current_rss_mb()
+        with self._lock:
+            # RSS до таблицы - замер после последней пачки предыдущей.
+            stats = self.memory.setdefault(table, {'rss_before_mb': self._last_rss, 'peak_rss_mb': rss})
+            stats['peak_rss_mb'] = max(stats['peak_rss_mb'], rss)
+            stats['rss_after_mb'] = self._last_rss = rss
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                stats['py_peak_mb'] = max(stats.get('py_peak_mb', 0.0), peak / 2 ** 20)
+
+
+def read_only(file_name: str, sizer: BatchSizer, metrics: MigrationMetrics, readers: int) -> None:
+    """Функция проходит все пачки SQLiteLoader без записи и учитывает их в metrics."""
+    loader = SQLiteLoader(connect_sqlite(file_name).cursor(), sizer=sizer, readers=readers)
+    for batch in loader.load_movies():
+        if batch.get('finished'):
+            continue
+        metrics.record_batch(table=batch['table'], batch=batch.get('batch'), rows_read=len(batch['data']),
+                             rows_written=0, bytes_sent=0, read_s=batch.get('read_s', 0.0),
+                             convert_s=batch.get('convert_s', 0.0), write_s=0.0)
+
+
+def table_stats(metrics: TableMemoryMetrics) -> dict:
+    """Функция переводит итоги MigrationMetrics по таблицам в результаты бенчмарка."""
+    tables = {}
+    for table, totals in metrics.tables.items():
+        total = totals.read_s + totals.convert_s + totals.write_s
+        tables[table] = {
+            'rows': totals.rows_read,
+            'rows_written': totals.rows_written,
+            'rows_skipped': totals.rows_skipped,
+            'rows_rejected': totals.rows_rejected,
+            'batches': totals.batches,
+            'max_batch': totals.max_batch,
+            'mb_sent': totals.bytes_sent / 2 ** 20,
+            'read_s': totals.read_s,
+            'convert_s': totals.convert_s,
+            'write_s': totals.write_s,
+            'total_s': total,
+            'rows_per_sec': totals.rows_per_second,
+            **metrics.memory.get(table, {}),
+        }
+    return tables
+
+
+def run(file_name: str, mode: str = WRITE_MODE, write: bool = True, truncate: bool = False,
+        readers: int = READERS, trace_memory: bool = False) -> dict:
+    """Функция прогоняет перенос всех таблиц и возвращает результаты замеров."""
+    metrics = TableMemoryMetrics(trace_memory=trace_memory)
+    sizer = BatchSizer(sizes=parse_sizes(WRITE_SIZES), adaptive=BATCH_ADAPTIVE)
+    started = time.perf_counter()
+    if write:
+        with psycopg.connect(**dsl, row_factory=dict_row, cursor_factory=ClientCursor) as pg_conn:
+            if truncate:
+                with pg_conn.cursor() as cursor:
+                    for table, _ in reversed(SQLiteLoader.tables):
+                        PostgresSaver._clear_data_table(cursor=cursor, table=table)
+                pg_conn.commit()
+            started = time.perf_counter()
+            load_from_sqlite(connect_sqlite(file_name).cursor(), pg_conn, mode=mode, reset=True,
+                             metrics=metrics, sizer=sizer, readers=readers)
+    else:
+        read_only(file_name, sizer, metrics, readers)
+    elapsed = time.perf_counter() - started
+    if trace_memory:
+        tracemalloc.stop()
+    metrics.close()
+
+    tables = table_stats(metrics)
+    rows = sum(stats['rows'] for stats in tables.values())
+    return {
+        'meta': {
+            'started': datetime.now(timezone.utc).isoformat(),
+            'source': file_name,
+            'source_size_mb': os.path.getsize(file_name) / 2 ** 20,
+            'mode': mode if write else 'no-write',
+            'read_size': sizer.read_size,
+            'readers': readers,
+            'trace_memory': trace_memory,
+            'python': platform.python_version(),
+            'psycopg': psycopg.__version__,
+        },
+        'tables': tables,
+        'total': {
+            'rows': rows,
+            'total_s': elapsed,
+            'rows_per_sec': rows / elapsed if elapsed else 0.0,
+            'peak_rss_mb': peak_rss_mb(),
+        },
+    }
+
+
+def print_summary(results: dict) -> None:
+    print(f"{'table':<18}{'rows':>10}{'written':>10}{'read, s':>10}{'convert, s':>12}{'write, s':>10}"
+          f"{'rows/s':>12}{'RSS, MB':>10}{'py, MB':>9}")
+    for table, stats in results['tables'].items():
+        print(f"{table:<18}{stats['rows']:>10}{stats['rows_written']:>10}{stats['read_s']:>10.2f}"
+              f"{stats['convert_s']:>12.2f}{stats['write_s']:>10.2f}{stats['rows_per_sec']:>12.0f}"
+              f"{stats.get('peak_rss_mb', 0.0):>10.1f}{stats.get('py_peak_mb', 0.0):>9.1f}")
+    total = results['total']
+    print(f"{'total':<18}{total['rows']:>10}{total['total_s']:>42.2f}{total['rows_per_sec']:>12.0f}")
+    print(f"Пиковый RSS: {total['peak_rss_mb']:.1f} МБ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк переноса данных sqlite -> postgres.')
+    parser.add_argument('--db', help='готовая база sqlite; если не указана, генерируется синтетическая')
+    parser.add_argument('--size', type=parse_size, default=SIZES['10k'],
+                        help=f"строк в связующих таблицах синтетической базы: {', '.join(SIZES)} или число")
+    parser.add_argument('--mode', choices=WRITE_MODES, default=WRITE_MODE)
+    parser.add_argument('--no-write', action='store_true', help='не писать в postgres')
+    parser.add_argument('--truncate', action='store_true', help='очистить таблицы postgres перед прогоном')
+    parser.add_argument('--readers', type=int, default=READERS, help='потоков чтения sqlite на таблицу')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='замерять пик памяти python по таблицам через tracemalloc (замедляет прогон)')
+    parser.add_argument('--output', default='benchmark.json', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_name = args.db
+        if file_name is None:
+            file_name = os.path.join(tmp, 'bench.sqlite')
+            generate(file_name, args.size)
+        results = run(file_name, mode=args.mode, write=not args.no_write, truncate=args.truncate,
+                      readers=args.readers, trace_memory=args.trace_memory)
+
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(results, output, ensure_ascii=False, indent=2)
+    print_summary(results)
+
+
+if __name__ == '__main__':
+    main()
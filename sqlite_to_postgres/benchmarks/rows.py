@@ -0,0 +1,107 @@
+"""Микро-бенчмарк разбора строк sqlite в dataclass-схемы.
+
+Сравнивает прежний путь (dataclass без __slots__, значения остаются текстом,
+astuple при записи) с текущим (dataclass со __slots__, приведение типов
+make_converter, кортеж через row_getter).
+
+Запуск из каталога sqlite_to_postgres:
+
+    python -m benchmarks.rows [--rows 100000]
+"""
+import argparse
+import timeit
+import tracemalloc
+import uuid
+from dataclasses import astuple, fields, make_dataclass
+from datetime import date, datetime
+
+from schemas import FilmWork, Genre, GenreFilmWork, Person, PersonFilmWork, make_converter, row_getter
+
+SCHEMAS = (Genre, Person, FilmWork, GenreFilmWork, PersonFilmWork)
+
+SAMPLE_VALUES = {
+    datetime: lambda n: f'2021-06-16 20:14:09.{n % 1000000:06d}+00',
+    date: lambda n: f'20{n % 100:02d}-06-16',
+    float: lambda n: n % 100 / 10,
+    str: lambda n: f'The Star Wars Holiday Special {n}',
+}
+
+
+def sample_row(schema, n: int) -> tuple:
+    """Функция создает строку в том виде, в котором ее возвращает sqlite."""
+    return tuple(str(uuid.uuid4()) if field.name == 'id' or field.name.endswith('_id')
+                 else SAMPLE_VALUES.get(field.type, SAMPLE_VALUES[str])(n)
+                 for field in fields(schema))
+
+
+def sample_rows(schema, count: int) -> list:
+    """Функция создает пачку строк sqlite."""
+    return [sample_row(schema, n) for n in range(count)]
+
+
+def legacy_schema(schema):
+    """Функция создает копию схемы без __slots__, как до перехода на компактные строки."""
+    return make_dataclass(schema.__name__, [(field.name, field.type) for field in fields(schema)])
+
+
+def per_row_ns(func, rows) -> float:
+    """Функция возвращает лучшее время обработки одной строки в наносекундах."""
+    best = min(timeit.repeat(lambda: func(rows), number=1, repeat=5))
+    return best / len(rows) * 1e9
+
+
+def bytes_per_row(build, schema, count: int) -> float:
+    """Функция возвращает объем памяти, который удерживает одна разобранная строка.
+
+    Строки sqlite создаются внутри замера и освобождаются после разбора,
+    поэтому учитываются только значения, оставшиеся в объектах схемы.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = sample_rows(schema, count)
+    objects = build(rows)
+    del rows
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def run(count: int) -> list:
+    """Функция измеряет стоимость разбора и выдачи строки для каждой схемы."""
+    results = []
+    for schema in SCHEMAS:
+        rows = sample_rows(schema, count)
+        legacy = legacy_schema(schema)
+        convert = make_converter(schema)
+        values = row_getter(schema)
+
+        def build_before(data):
+            return [legacy(*row) for row in data]
+
+        def build_after(data):
+            return [convert(row) for row in data]
+
+        results.append({
+            'schema': schema.__name__,
+            'before_ns': per_row_ns(lambda data: [astuple(obj) for obj in build_before(data)], rows),
+            'after_ns': per_row_ns(lambda data: [values(obj) for obj in build_after(data)], rows),
+            'before_bytes': bytes_per_row(build_before, schema, count),
+            'after_bytes': bytes_per_row(build_after, schema, count),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк разбора строк sqlite.')
+    parser.add_argument('--rows', type=int, default=100_000, help='количество строк на схему')
+    args = parser.parse_args()
+
+    print(f"{'schema':<16}{'до, нс/стр':>14}{'после, нс/стр':>16}{'до, байт/стр':>16}{'после, байт/стр':>18}")
+    for result in run(args.rows):
+        print(f"{result['schema']:<16}{result['before_ns']:>14.0f}{result['after_ns']:>16.0f}"
+              f"{result['before_bytes']:>16.0f}{result['after_bytes']:>18.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import logging
+from dataclasses import dataclass, fields
+from typing import Dict, Iterable, Optional
+
+import psycopg
+from psycopg import connection as _connection
+
+CHECKPOINT_TABLE = 'migration_checkpoint'
+
+# Запросы записи прогресса, общие для синхронного и асинхронного загрузчиков.
+# Строки читаются в порядке rowid, а не modified, поэтому наибольший modified
+# незавершенного прохода копится в pending_modified и переносится в
+# last_modified (отметку для --since last) только когда таблица дочитана:
+# иначе после сбоя повторный запуск пропустил бы непрочитанные строки
+# с modified между старой и новой отметкой.
+SAVE_SQL = (
+    f"INSERT INTO {CHECKPOINT_TABLE} (table_name, last_rowid, batch, pending_modified) "
+    f"VALUES (%s, %s, %s, %s) "
+    f"ON CONFLICT (table_name) DO UPDATE SET "
+    f"last_rowid = GREATEST({CHECKPOINT_TABLE}.last_rowid, EXCLUDED.last_rowid), "
+    f"batch = EXCLUDED.batch, "
+    f"pending_modified = GREATEST({CHECKPOINT_TABLE}.pending_modified, EXCLUDED.pending_modified), "
+    f"updated = now()"
+)
+FINISH_SQL = (
+    f"INSERT INTO {CHECKPOINT_TABLE} (table_name, finished) VALUES (%s, TRUE) "
+    f"ON CONFLICT (table_name) DO UPDATE SET finished = TRUE, "
+    f"last_modified = GREATEST({CHECKPOINT_TABLE}.last_modified, {CHECKPOINT_TABLE}.pending_modified), "
+    f"pending_modified = NULL, updated = now()"
+)
+
+
+@dataclass
+class Checkpoint:
+    table_name: str
+    last_rowid: int = 0
+    batch: int = 0
+    last_modified: Optional[str] = None
+    finished: bool = False
+
+
+def timestamp_field(schema) -> str:
+    """Функция возвращает поле, по которому отбираются изменённые строки.
+
+    У связующих таблиц нет поля modified, для них используется created.
+    """
+    names = {field.name for field in fields(schema)}
+    return 'modified' if 'modified' in names else 'created'
+
+
+class CheckpointStore:
+    """Хранит в postgres прогресс загрузки каждой таблицы.
+
+    Контрольная точка пишется тем же курсором и в той же транзакции,
+    что и пачка данных, поэтому после сбоя повторный запуск продолжает
+    загрузку ровно с первой незафиксированной пачки. Наибольший modified
+    прочитанных строк становится отметкой last_modified только в finish.
+    """
+
+    def __init__(self, pg_conn: _connection):
+        self.pg_conn = pg_conn
+
+    def ensure(self) -> None:
+        """Функция создает таблицу контрольных точек, если её нет."""
+        with self.pg_conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                    table_name TEXT PRIMARY KEY,
+                    last_rowid BIGINT NOT NULL DEFAULT 0,
+                    batch INTEGER NOT NULL DEFAULT 0,
+                    last_modified TEXT,
+                    pending_modified TEXT,
+                    finished BOOLEAN NOT NULL DEFAULT FALSE,
+                    updated timestamp with time zone DEFAULT now()
+                )
+            """)
+            # Таблица, созданная прежними версиями загрузчика.
+            cursor.execute(f"ALTER TABLE {CHECKPOINT_TABLE} ADD COLUMN IF NOT EXISTS pending_modified TEXT")
+        self.pg_conn.commit()
+
+    def load(self) -> Dict[str, Checkpoint]:
+        """Функция возвращает контрольные точки всех таблиц."""
+        with self.pg_conn.cursor() as cursor:
+            cursor.execute(f"SELECT table_name, last_rowid, batch, last_modified, finished "
+                           f"FROM {CHECKPOINT_TABLE}")
+            checkpoints = {row['table_name']: Checkpoint(**row) for row in cursor.fetchall()}
+        self.pg_conn.commit()
+        return checkpoints
+
+    def reset(self, tables: Iterable[str]) -> None:
+        """Функция удаляет контрольные точки таблиц, чтобы загрузить их заново."""
+        with self.pg_conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE table_name = ANY(%s)", (list(tables),))
+        self.pg_conn.commit()
+        logging.info("Контрольные точки сброшены")
+
+    @staticmethod
+    def save(cursor: psycopg.cursor, table: str, last_rowid: int, batch: int,
+             last_modified: Optional[str]) -> None:
+        """Функция сохраняет прогресс таблицы после записи пачки."""
+        cursor.execute(SAVE_SQL, (table, last_rowid, batch, last_modified))
+
+    @staticmethod
+    def finish(cursor: psycopg.cursor, table: str) -> None:
+        """Функция отмечает таблицу полностью загруженной."""
+        cursor.execute(FINISH_SQL, (table,))
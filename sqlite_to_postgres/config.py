@@ -5,11 +5,74 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO, filename="py_log.log", filemode="w",
+# Лог дописывается: после возобновления загрузки с контрольной точки история прошлых запусков сохраняется.
+logging.basicConfig(level=logging.INFO, filename="py_log.log", filemode="a",
                     format="%(asctime)s %(levelname)s %(message)s")
 
 SIZE = 100
 
+# Размер пачки чтения из sqlite (fetchmany) и пачки записи в postgres.
+# WRITE_SIZES задает размер записи отдельных таблиц: 'film_work=500,genre_film_work=5000'.
+READ_SIZE = int(os.environ.get('READ_SIZE', SIZE))
+WRITE_SIZE = int(os.environ.get('WRITE_SIZE', SIZE))
+WRITE_SIZES = os.environ.get('WRITE_SIZES')
+
+# Чтение sqlite: отображение файла в память и кеш страниц в мегабайтах.
+SQLITE_MMAP_MB = int(os.environ.get('SQLITE_MMAP_MB', 256))
+SQLITE_CACHE_MB = int(os.environ.get('SQLITE_CACHE_MB', 64))
+
+# Потоки чтения одной таблицы по диапазонам rowid и сколько диапазонов каждый может прочитать впрок.
+READERS = int(os.environ.get('READERS', 1))
+READ_QUEUE = int(os.environ.get('READ_QUEUE', 4))
+
+# Подбор размера пачки записи: границы, желаемое время commit и предельный объем пачки.
+BATCH_ADAPTIVE = os.environ.get('BATCH_ADAPTIVE', 'False') == 'True'
+BATCH_MIN = int(os.environ.get('BATCH_MIN', 100))
+BATCH_MAX = int(os.environ.get('BATCH_MAX', 50_000))
+BATCH_TARGET_SECONDS = float(os.environ.get('BATCH_TARGET_SECONDS', 0.5))
+BATCH_MAX_MB = float(os.environ.get('BATCH_MAX_MB', 64))
+
+# Способ записи в postgres: insert (INSERT ... VALUES) или copy (COPY через временную таблицу).
+WRITE_MODES = ('insert', 'copy')
+WRITE_MODE = os.environ.get('WRITE_MODE', 'insert')
+
+# Количество потоков для параллельной загрузки таблиц.
+WORKERS = int(os.environ.get('WORKERS', 1))
+
+# Сколько прочитанных пачек может ждать записи в асинхронном загрузчике.
+QUEUE_SIZE = int(os.environ.get('QUEUE_SIZE', 4))
+
+# Повторы пачки при временных ошибках postgres: количество и начальная задержка в секундах.
+RETRIES = int(os.environ.get('RETRIES', 3))
+RETRY_DELAY = float(os.environ.get('RETRY_DELAY', 0.5))
+
+# Строки, отклоненные postgres (нарушение CHECK, внешнего ключа и т.п.), с текстом ошибки.
+DEAD_LETTER_FILE = os.environ.get('DEAD_LETTER_FILE', 'rejected.jsonl')
+
+# Проверка ссылок связующих таблиц по индексу id родительских таблиц: set, bloom или none.
+# Для bloom - ожидаемое количество id в одной таблице и доля ложных срабатываний.
+ID_INDEX = os.environ.get('ID_INDEX', 'none')
+ID_INDEX_CAPACITY = int(os.environ.get('ID_INDEX_CAPACITY', 10_000_000))
+ID_INDEX_ERROR_RATE = float(os.environ.get('ID_INDEX_ERROR_RATE', 0.01))
+# Строки без родителя: drop - убрать из пачки и записать в dead letter, report - только записать в лог.
+ORPHANS = os.environ.get('ORPHANS', 'drop')
+
+# Удаление повторов естественного ключа связующих таблиц и сколько ключей держать в памяти до сброса на диск.
+DEDUP = os.environ.get('DEDUP', 'False') == 'True'
+DEDUP_MAX_KEYS = int(os.environ.get('DEDUP_MAX_KEYS', 2_000_000))
+
+# Какие конфликты пропускать при записи: id (ON CONFLICT (id)) или natural - также
+# уникальные индексы связующих таблиц по естественному ключу.
+CONFLICT_TARGETS = ('id', 'natural')
+CONFLICT = os.environ.get('CONFLICT', 'id')
+
+# Показатели каждой пачки (JSON lines) и файл для Prometheus textfile collector.
+METRICS_FILE = os.environ.get('METRICS_FILE', 'metrics.jsonl')
+PROMETHEUS_FILE = os.environ.get('PROMETHEUS_FILE')
+
+# Значение --since для загрузки строк, измененных после прошлого запуска.
+SINCE_LAST = 'last'
+
 dsl = {
     'dbname': os.environ.get('DB_NAME'),
     'user': os.environ.get('DB_USER'),
@@ -0,0 +1,43 @@
+import json
+import threading
+import time
+from dataclasses import asdict
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class DeadLetterFile:
+    """Файл JSON lines со строками, которые postgres отклонил при загрузке.
+
+    Каждая строка содержит таблицу, значения полей, текст ошибки и SQLSTATE,
+    чтобы после исправления данных строки можно было загрузить повторно.
+    Файл открывается при первой отклоненной строке.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.rejected: Dict[str, int] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, table: str, rows: Iterable[Tuple[object, Exception]]) -> None:
+        """Функция дописывает отклоненные строки таблицы вместе с ошибками."""
+        with self._lock:
+            for row, error in rows:
+                self.rejected[table] = self.rejected.get(table, 0) + 1
+                if self.path is None:
+                    continue
+                if self._file is None:
+                    self._file = open(self.path, 'a', buffering=1, encoding='utf-8')
+                self._file.write(json.dumps({
+                    'ts': round(time.time(), 3),
+                    'table': table,
+                    'row': asdict(row),
+                    'error': str(error).strip(),
+                    'sqlstate': getattr(error, 'sqlstate', None),
+                }, ensure_ascii=False, default=str) + '\n')
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
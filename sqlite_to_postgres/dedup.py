@@ -0,0 +1,144 @@
+import logging
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from config import DEDUP_MAX_KEYS
+
+# Естественные ключи связующих таблиц: колонки уникальных индексов
+# idx_genre_film_work_unique и idx_person_film_work_unique.
+NATURAL_KEYS = {
+    'genre_film_work': ('film_work_id', 'genre_id'),
+    'person_film_work': ('film_work_id', 'person_id', 'role'),
+}
+
+# Сколько ключей проверять в сброшенном на диск множестве одним запросом.
+SPILL_CHUNK = 500
+
+
+def natural_key(row, columns: Tuple[str, ...]) -> Optional[bytes]:
+    """Функция собирает ключ строки из 16-байтных uuid и текста.
+
+    Возвращает None, если одно из значений пустое: в уникальном индексе
+    postgres NULL не совпадает с другими значениями.
+    """
+    parts = []
+    for column in columns:
+        value = getattr(row, column)
+        if value is None:
+            return None
+        parts.append(value.bytes if isinstance(value, UUID) else str(value).encode('utf-8'))
+    return b'\x00'.join(parts)
+
+
+class SpillingKeySet:
+    """Множество ключей, ограниченное по памяти.
+
+    В памяти держится не больше max_keys ключей (около 100 байт на ключ).
+    Когда множество заполнено, ключи переносятся во временную базу sqlite
+    на диске (таблица с первичным ключом по ключу, без rowid), а множество
+    в памяти очищается. Проверка сначала идет по памяти, оставшиеся ключи
+    ищутся в sqlite запросами по SPILL_CHUNK ключей.
+    """
+
+    def __init__(self, max_keys: int = DEDUP_MAX_KEYS):
+        self.max_keys = max_keys
+        self.spilled = 0
+        self._keys = set()
+        self._disk = None
+
+    def add_new(self, keys: List[bytes]) -> List[bool]:
+        """Функция добавляет ключи и возвращает для каждого, встретился ли он впервые."""
+        candidates = {key for key in keys if key not in self._keys}
+        seen_on_disk = self._find_on_disk(candidates) if self._disk is not None else set()
+        result = []
+        for key in keys:
+            new = key not in self._keys and key not in seen_on_disk
+            if new:
+                self._keys.add(key)
+            result.append(new)
+        if len(self._keys) >= self.max_keys:
+            self._spill()
+        return result
+
+    def _find_on_disk(self, keys: set) -> set:
+        found, keys = set(), list(keys)
+        for start in range(0, len(keys), SPILL_CHUNK):
+            chunk = keys[start:start + SPILL_CHUNK]
+            found.update(row[0] for row in self._disk.execute(
+                f"SELECT key FROM seen WHERE key IN ({', '.join('?' * len(chunk))})", chunk))
+        return found
+
+    def _spill(self) -> None:
+        if self._disk is None:
+            # Пустое имя - временная база sqlite на диске, которая удаляется при закрытии.
+            self._disk = sqlite3.connect('', check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=OFF")
+            self._disk.execute("PRAGMA synchronous=OFF")
+            self._disk.execute("CREATE TABLE seen (key BLOB PRIMARY KEY) WITHOUT ROWID")
+        with self._disk:
+            self._disk.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((key,) for key in self._keys))
+        self.spilled += len(self._keys)
+        logging.info(f"Множество ключей сброшено на диск: {self.spilled} ключей")
+        self._keys.clear()
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+
+class Deduplicator:
+    """Убирает из потока пачек строки связующих таблиц с повторным естественным ключом.
+
+    Строки с новым id, но с уже встречавшимися (film_work_id, genre_id) или
+    (film_work_id, person_id, role) нарушили бы уникальный индекс и
+    отклонили бы пачку. Первая строка с ключом проходит, остальные
+    убираются из пачки и считаются в collapsed. Для каждой таблицы
+    используется свое SpillingKeySet, поэтому память ограничена при любом
+    размере таблицы.
+    Дубли строк, записанных прошлыми запусками, пропускает postgres при
+    записи с conflict='natural'.
+    """
+
+    def __init__(self, max_keys: int = DEDUP_MAX_KEYS):
+        self.max_keys = max_keys
+        self.collapsed: Dict[str, int] = {}
+        self._seen: Dict[str, SpillingKeySet] = {}
+
+    def deduplicate(self, batches: Iterable[dict]) -> Iterator[dict]:
+        """Функция пропускает пачки загрузчика, убирая повторы естественного ключа."""
+        for batch in batches:
+            table = batch['table']
+            columns = NATURAL_KEYS.get(table)
+            if columns is None:
+                yield batch
+                continue
+            if batch.get('finished'):
+                self.close(table)
+                yield batch
+                continue
+            self._collapse(batch, columns)
+            yield batch
+
+    def _collapse(self, batch: dict, columns: Tuple[str, ...]) -> None:
+        table = batch['table']
+        seen = self._seen.setdefault(table, SpillingKeySet(self.max_keys))
+        keys = [natural_key(row, columns) for row in batch['data']]
+        # Строки с пустым значением в ключе не сравниваются, как и в уникальном индексе.
+        new = iter(seen.add_new([key for key in keys if key is not None]))
+        kept = [row for row, key in zip(batch['data'], keys) if key is None or next(new)]
+        duplicates = len(batch['data']) - len(kept)
+        if not duplicates:
+            return
+        batch['data'] = kept
+        batch['duplicates'] = duplicates
+        self.collapsed[table] = self.collapsed.get(table, 0) + duplicates
+        logging.info(f"Таблица {table}, пачка {batch.get('batch')}: убрано дублей {duplicates}")
+
+    def close(self, table: Optional[str] = None) -> None:
+        """Функция удаляет временные множества таблицы или всех таблиц."""
+        for name in [table] if table is not None else list(self._seen):
+            seen = self._seen.pop(name, None)
+            if seen is not None:
+                seen.close()
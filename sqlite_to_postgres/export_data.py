@@ -0,0 +1,221 @@
+"""Выгрузка данных из postgres обратно в sqlite или в файлы Parquet.
+
+Каждая таблица читается именованным (серверным) курсором пачками по chunk
+строк, поэтому в памяти одновременно находится не больше одной пачки.
+Колонки и их порядок берутся из схем schemas, как и при загрузке.
+
+В sqlite таблицы создаются заново и пишутся executemany в одной транзакции
+с journal_mode=OFF и synchronous=OFF: файл выгрузки можно пересоздать,
+поэтому журнал и fsync не нужны. Значения приводятся к тексту на стороне
+postgres в том же виде, что в исходном db.sqlite, так что выгрузку можно
+снова загрузить load_data.py или сравнить verify.py.
+
+В Parquet каждая таблица пишется в отдельный файл, пачка - одной группой
+строк. Для этого нужен pyarrow, он не входит в обязательные зависимости.
+
+Запуск из каталога sqlite_to_postgres:
+
+    python export_data.py [--output export.sqlite] [--format sqlite|parquet] [--chunk 10000] [--tables ...]
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import psycopg
+from psycopg import connection as _connection
+from psycopg.rows import tuple_row
+
+from config import dsl
+from load_data import SQLiteLoader
+from schemas import SQLITE_TYPES
+
+CHUNK_SIZE = 10_000
+FORMATS = ('sqlite', 'parquet')
+
+# Выражения postgres, дающие значение в текстовом виде исходного db.sqlite.
+SQLITE_EXPRESSIONS = {
+    UUID: "{column}::text",
+    datetime: "to_char({column} AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS.US') || '+00'",
+    date: "to_char({column}, 'YYYY-MM-DD')",
+}
+
+# Для Parquet приводятся только uuid: у Arrow нет своего типа uuid.
+PARQUET_EXPRESSIONS = {
+    UUID: "{column}::text",
+}
+
+
+@dataclass
+class TableExport:
+    table: str
+    rows: int = 0
+    chunks: int = 0
+    read_s: float = 0.0
+    write_s: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.read_s + self.write_s
+        return self.rows / elapsed if elapsed else 0.0
+
+
+def select_query(table: str, schema, expressions: dict) -> str:
+    """Функция собирает запрос с колонками схемы в порядке ее полей."""
+    columns = ', '.join(
+        expressions.get(schema_field.type, '{column}').format(column=schema_field.name)
+        for schema_field in fields(schema)
+    )
+    return f"SELECT {columns} FROM {table}"
+
+
+def postgres_chunks(pg_conn: _connection, table: str, schema, expressions: dict,
+                    chunk_size: int, export: TableExport) -> Iterator[List[tuple]]:
+    """Функция читает таблицу postgres серверным курсором пачками по chunk_size строк."""
+    with pg_conn.cursor(name=f'export_{table}', row_factory=tuple_row) as cursor:
+        cursor.itersize = chunk_size
+        cursor.execute(select_query(table, schema, expressions))
+        while True:
+            started = time.perf_counter()
+            rows = cursor.fetchmany(chunk_size)
+            export.read_s += time.perf_counter() - started
+            if not rows:
+                return
+            yield rows
+
+
+class SQLiteExporter:
+    """Пишет таблицы в файл sqlite с колонками в порядке полей схем."""
+
+    expressions = SQLITE_EXPRESSIONS
+
+    def __init__(self, file_name: str):
+        self.conn = sqlite3.connect(file_name, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("BEGIN")
+
+    def create_table(self, table: str, schema) -> None:
+        columns = ', '.join(
+            f"{schema_field.name} {SQLITE_TYPES.get(schema_field.type, 'TEXT')}"
+            f"{' PRIMARY KEY' if schema_field.name == 'id' else ''}"
+            for schema_field in fields(schema)
+        )
+        self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.conn.execute(f"CREATE TABLE {table} ({columns})")
+        self._insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(fields(schema)))})"
+
+    def write(self, rows: List[tuple]) -> None:
+        self.conn.executemany(self._insert, rows)
+
+    def finish_table(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.conn.execute("COMMIT")
+        self.conn.close()
+
+
+class ParquetExporter:
+    """Пишет каждую таблицу в файл <каталог>/<таблица>.parquet."""
+
+    expressions = PARQUET_EXPRESSIONS
+
+    def __init__(self, directory: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Для выгрузки в Parquet нужен pyarrow: pip install pyarrow") from None
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.arrow_types = {
+            UUID: pyarrow.string(),
+            str: pyarrow.string(),
+            datetime: pyarrow.timestamp('us', tz='UTC'),
+            date: pyarrow.date32(),
+            float: pyarrow.float64(),
+        }
+        self.directory = directory
+        self._writer = None
+        os.makedirs(directory, exist_ok=True)
+
+    def create_table(self, table: str, schema) -> None:
+        self._schema = self.pa.schema([(schema_field.name, self.arrow_types[schema_field.type])
+                                       for schema_field in fields(schema)])
+        self._writer = self.pq.ParquetWriter(os.path.join(self.directory, f'{table}.parquet'), self._schema)
+
+    def write(self, rows: List[tuple]) -> None:
+        columns = [self.pa.array(values, type=column.type) for values, column in zip(zip(*rows), self._schema)]
+        self._writer.write_batch(self.pa.RecordBatch.from_arrays(columns, schema=self._schema))
+
+    def finish_table(self) -> None:
+        self._writer.close()
+        self._writer = None
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def export_tables(pg_conn: _connection, exporter, tables: Optional[List[Tuple[str, type]]] = None,
+                  chunk_size: int = CHUNK_SIZE) -> List[TableExport]:
+    """Функция выгружает таблицы postgres и возвращает показатели по каждой таблице."""
+    results = []
+    for table, schema in tables or SQLiteLoader.tables:
+        export = TableExport(table=table)
+        exporter.create_table(table, schema)
+        for rows in postgres_chunks(pg_conn, table, schema, exporter.expressions, chunk_size, export):
+            started = time.perf_counter()
+            exporter.write(rows)
+            export.write_s += time.perf_counter() - started
+            export.rows += len(rows)
+            export.chunks += 1
+        exporter.finish_table()
+        pg_conn.commit()
+        logging.info(f"Таблица {table} выгружена: {export.rows} строк, {export.rows_per_second:.0f} строк/с")
+        results.append(export)
+    return results
+
+
+def print_report(results: List[TableExport]) -> None:
+    header = f"{'table':<18}{'chunks':>8}{'rows':>11}{'read s':>9}{'write s':>9}{'rows/s':>11}"
+    print(header)
+    print('-' * len(header))
+    for export in results:
+        print(f'{export.table:<18}{export.chunks:>8}{export.rows:>11}{export.read_s:>9.2f}'
+              f'{export.write_s:>9.2f}{export.rows_per_second:>11.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Выгрузка данных из Postgres в sqlite или Parquet.')
+    parser.add_argument('--output', help='файл sqlite или каталог для Parquet '
+                                         '(по умолчанию export.sqlite или export)')
+    parser.add_argument('--format', choices=FORMATS, default='sqlite', help='формат выгрузки')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='строк в пачке чтения и записи')
+    parser.add_argument('--tables', nargs='*', help='выгружаемые таблицы, по умолчанию все')
+    args = parser.parse_args()
+
+    tables = [(table, schema) for table, schema in SQLiteLoader.tables
+              if not args.tables or table in args.tables]
+    if args.format == 'parquet':
+        exporter = ParquetExporter(args.output or 'export')
+    else:
+        exporter = SQLiteExporter(args.output or 'export.sqlite')
+    started = time.perf_counter()
+    try:
+        with psycopg.connect(**dsl) as pg_conn:
+            results = export_tables(pg_conn, exporter, tables, chunk_size=args.chunk)
+    finally:
+        exporter.close()
+    print_report(results)
+    logging.info(f"Выгрузка завершена за {time.perf_counter() - started:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
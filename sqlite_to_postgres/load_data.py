@@ -1,9 +1,14 @@
+import argparse
+import itertools
 import sqlite3
-from dataclasses import fields, astuple
-from typing import List, Optional
+import sys
+import time
+from dataclasses import fields
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from contextlib import contextmanager
 import psycopg
 from psycopg import ClientCursor, connection as _connection
+from psycopg.copy import LibpqWriter
 from psycopg.rows import dict_row
 from schemas import (
     Person as PersonSchema,
@@ -11,14 +16,25 @@ from schemas import (
     GenreFilmWork as GenreFilmWorkSchema,
     PersonFilmWork as PersonFilmWorkSchema,
     FilmWork as FilmWorkSchema,
+    make_converter,
+    pg_types,
+    row_getter,
 )
 
-from .config import *
+from batching import BatchSizer, parse_sizes
+from checkpoint import Checkpoint, CheckpointStore, timestamp_field
+from config import *
+from dead_letter import DeadLetterFile
+from dedup import NATURAL_KEYS, Deduplicator
+from metrics import MigrationMetrics
+from scheduler import TableScheduler, WorkerConnections, build_dependencies
+from sqlite_reader import connect_sqlite, database_file, parallel_chunks, select_columns
+from validation import ID_INDEXES, ORPHAN_MODES, ReferenceValidator
 
 
 @contextmanager
 def open_db(file_name: str):
-    conn = sqlite3.connect(file_name)
+    conn = connect_sqlite(file_name)
     try:
         logging.info("Creating connection")
         yield conn.cursor()
@@ -36,55 +52,247 @@ def closing(thing):
         thing.close()
 
 
+# Ошибки, вызванные значениями строк: такую пачку делим пополам, пока не найдем плохие строки.
+ROW_ERRORS = (psycopg.IntegrityError, psycopg.DataError, psycopg.errors.CardinalityViolation)
+# Временные ошибки (взаимоблокировка, отмена запроса, обрыв соединения): пачку повторяем целиком.
+TRANSIENT_ERRORS = (psycopg.OperationalError,)
+SAVEPOINT = 'batch_write'
+
+
+class CountingWriter(LibpqWriter):
+    """Писатель COPY, который считает отправленные в postgres байты."""
+
+    def __init__(self, cursor: psycopg.cursor):
+        super().__init__(cursor)
+        self.bytes_sent = 0
+
+    def write(self, data) -> None:
+        self.bytes_sent += len(data)
+        super().write(data)
+
+
 class PostgresSaver:
-    def __init__(self, pg_conn: _connection):
+    def __init__(self, pg_conn: _connection, mode: str = WRITE_MODE,
+                 checkpoints: Optional[CheckpointStore] = None, upsert: bool = False,
+                 metrics: Optional[MigrationMetrics] = None, sizer: Optional[BatchSizer] = None,
+                 dead_letter: Optional[DeadLetterFile] = None, retries: int = RETRIES,
+                 retry_delay: float = RETRY_DELAY, conflict: str = CONFLICT):
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Неизвестный способ записи: {mode}")
+        if conflict not in CONFLICT_TARGETS:
+            raise ValueError(f"Неизвестная обработка конфликтов: {conflict}")
         self.pg_conn = pg_conn
+        self.mode = mode
+        self.checkpoints = checkpoints
+        self.upsert = upsert
+        self.metrics = metrics
+        self.sizer = sizer
+        self.dead_letter = dead_letter or DeadLetterFile(None)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.conflict = conflict
+
+    def save_all_data(self, data: Iterable[dict]) -> bool:
+        """Функция добавляет данные в postgres пачками по мере их поступления.
 
-    def save_all_data(self, data: List[dict]) -> None:
-        """Функция добавляет данные в postgres."""
+        Каждая пачка фиксируется вместе со своей контрольной точкой.
+        Строки, которые отклонил postgres, пропускаются и пишутся в dead_letter.
+        Возвращает False, если запись прервалась из-за ошибки,
+        которую не исправили повторы, или если прервалось чтение data.
+        """
         with self.pg_conn.cursor() as cursor:
-            flag = self._check_table_values(cursor=cursor, table=data[0].get('table'))
+            current_table, rows_count, started = None, 0, time.perf_counter()
+            try:
+                for batch in data:
+                    try:
+                        table_str = batch.get('table')
+                        rows = batch.get('data')
 
-            if flag:
-                logging.info("Данные уже загружены")
-                return
+                        if table_str != current_table:
+                            self._log_speed(current_table, rows_count, started)
+                            current_table, rows_count, started = table_str, 0, time.perf_counter()
 
-            for table in data:
-                try:
-                    table_str = table.get('table')
-                    schema = table.get('schema')
-                    data = table.get('data')
+                        if batch.get('finished'):
+                            if self.checkpoints is not None:
+                                self.checkpoints.finish(cursor=cursor, table=table_str)
+                                self.pg_conn.commit()
+                            continue
 
-                    query = self._creating_query(cursor=cursor, table=table_str, schema=schema, data=data)
-                    cursor.execute(query)
-                    self.pg_conn.commit()
+                        write_started = time.perf_counter()
+                        written, bytes_sent, rejected = self._save_batch(cursor=cursor, batch=batch)
+                        rows_count += len(rows)
+                        self._record_batch(batch, written, bytes_sent, time.perf_counter() - write_started,
+                                           rejected)
 
-                except Exception as e:
-                    self.pg_conn.rollback()
-                    logging.error(e)
-                    return
+                    except Exception as e:
+                        self.pg_conn.rollback()
+                        logging.error(e)
+                        return False
+            except Exception as e:
+                # Ошибка чтения или подготовки пачек: таблица остается незавершенной.
+                self.pg_conn.rollback()
+                logging.error(f"Чтение данных прервано: {e}")
+                return False
+            self._log_speed(current_table, rows_count, started)
             logging.info('Данные добавлены в бд.')
+            return True
 
-    @staticmethod
-    def _check_table_values(cursor: psycopg.cursor, table: str) -> Optional[str]:
-        """Функция проверяет на наличие данных в таблице postgres."""
-        cursor.execute(f"SELECT id FROM {table} LIMIT 1")
-        value = cursor.fetchone()
-        return value
+    def _save_batch(self, cursor: psycopg.cursor, batch: dict) -> Tuple[int, int, int]:
+        """Функция записывает пачку и ее контрольную точку в одной транзакции.
+
+        Временные ошибки повторяются до retries раз с удвоением задержки.
+        Возвращает число записанных строк, отправленных байт и отклоненных строк.
+        """
+        table = batch['table']
+        for attempt in itertools.count():
+            rejected = []
+            try:
+                # Отложенные внешние ключи проверяются сразу, чтобы ошибка попала в точку сохранения пачки.
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+                written, bytes_sent = self._write_isolated(cursor=cursor, table=table, schema=batch['schema'],
+                                                           data=batch['data'], rejected=rejected)
+                if self.checkpoints is not None:
+                    self.checkpoints.save(cursor=cursor, table=table, last_rowid=batch.get('last_rowid'),
+                                          batch=batch.get('batch'), last_modified=batch.get('last_modified'))
+                self.pg_conn.commit()
+            except TRANSIENT_ERRORS as e:
+                if attempt >= self.retries or self.pg_conn.closed:
+                    raise
+                self.pg_conn.rollback()
+                delay = self.retry_delay * 2 ** attempt
+                logging.warning(f"Таблица {table}, пачка {batch.get('batch')}: {e}. Повтор через {delay:.1f} с")
+                time.sleep(delay)
+                continue
+            # Строки без родителя, убранные проверкой ссылок, пишутся только после фиксации пачки.
+            if batch.get('orphan_rows'):
+                self.dead_letter.write(table, batch['orphan_rows'])
+            if rejected:
+                self.dead_letter.write(table, rejected)
+                logging.warning(f"Таблица {table}, пачка {batch.get('batch')}: отклонено строк {len(rejected)}")
+            return written, bytes_sent, len(rejected)
+
+    def _write_isolated(self, cursor: psycopg.cursor, table: str, schema, data, rejected: list) -> Tuple[int, int]:
+        """Функция записывает строки внутри точки сохранения.
+
+        Если postgres отклонил пачку из-за значений строк, запись откатывается
+        до точки сохранения, и половины пачки пишутся отдельно, пока не
+        останутся одиночные плохие строки: они попадают в rejected.
+        Хорошие строки при этом пишутся крупными частями.
+        """
+        if not data:
+            return 0, 0
+        cursor.execute(f'SAVEPOINT {SAVEPOINT}')
+        try:
+            written, bytes_sent = self._write_batch(cursor=cursor, table=table, schema=schema, data=data)
+        except ROW_ERRORS as e:
+            cursor.execute(f'ROLLBACK TO SAVEPOINT {SAVEPOINT}')
+            cursor.execute(f'RELEASE SAVEPOINT {SAVEPOINT}')
+            if len(data) == 1:
+                rejected.append((data[0], e))
+                return 0, 0
+            middle = len(data) // 2
+            first = self._write_isolated(cursor=cursor, table=table, schema=schema, data=data[:middle],
+                                         rejected=rejected)
+            second = self._write_isolated(cursor=cursor, table=table, schema=schema, data=data[middle:],
+                                          rejected=rejected)
+            return first[0] + second[0], first[1] + second[1]
+        cursor.execute(f'RELEASE SAVEPOINT {SAVEPOINT}')
+        return written, bytes_sent
+
+    def _write_batch(self, cursor: psycopg.cursor, table: str, schema, data) -> Tuple[int, int]:
+        """Функция записывает пачку строк выбранным способом.
+
+        Возвращает число записанных строк (без пропущенных ON CONFLICT)
+        и число байт, отправленных в postgres.
+        """
+        conflict = self._conflict_clause(table, schema)
+        if self.mode == 'copy':
+            return self._copy_data(cursor=cursor, table=table, schema=schema, data=data, conflict=conflict)
+        query = self._creating_query(cursor=cursor, table=table, schema=schema, data=data, conflict=conflict)
+        cursor.execute(query)
+        return cursor.rowcount, len(query.encode())
+
+    def _record_batch(self, batch: dict, written: int, bytes_sent: int, write_s: float, rejected: int = 0) -> None:
+        """Функция передает показатели записанной пачки в sizer и metrics."""
+        if self.sizer is not None:
+            self.sizer.observe(batch['table'], rows=len(batch['data']), seconds=write_s, bytes_sent=bytes_sent)
+        if self.metrics is None:
+            return
+        # Строки без родителя, убранные из пачки до записи, учитываются как отклоненные,
+        # убранные дубли естественного ключа - как пропущенные.
+        orphans = batch.get('orphans', 0)
+        rows_read = len(batch['data']) + orphans + batch.get('duplicates', 0)
+        self.metrics.record_batch(table=batch['table'], batch=batch.get('batch'),
+                                  rows_read=rows_read, rows_written=written,
+                                  rows_rejected=rejected + orphans, bytes_sent=bytes_sent,
+                                  read_s=batch.get('read_s', 0.0),
+                                  convert_s=batch.get('convert_s', 0.0), write_s=write_s)
+
+    def _conflict_clause(self, table: str, schema) -> str:
+        """Функция возвращает ON CONFLICT: пропуск дублей или обновление изменённых строк.
+
+        При conflict='natural' у связующих таблиц пропускаются конфликты
+        по любому уникальному индексу, а обновление идет по естественному ключу.
+        """
+        natural = NATURAL_KEYS.get(table) if self.conflict == 'natural' else None
+        if not self.upsert:
+            return 'ON CONFLICT DO NOTHING' if natural else 'ON CONFLICT (id) DO NOTHING'
+        target = natural or ('id',)
+        updates = ', '.join(f'{field.name} = EXCLUDED.{field.name}'
+                            for field in fields(schema) if field.name != 'id' and field.name not in target)
+        if not updates:
+            return f'ON CONFLICT ({", ".join(target)}) DO NOTHING'
+        return f'ON CONFLICT ({", ".join(target)}) DO UPDATE SET {updates}'
+
+    def _log_speed(self, table: Optional[str], rows_count: int, started: float) -> None:
+        """Функция пишет в лог скорость записи таблицы."""
+        if table is None:
+            return
+        elapsed = time.perf_counter() - started
+        speed = rows_count / elapsed if elapsed else 0
+        logging.info(f"Таблица {table} ({self.mode}): {rows_count} строк за {elapsed:.2f} с, {speed:.0f} строк/с")
 
     @staticmethod
-    def _creating_query(cursor: psycopg.cursor, table: str, schema, data) -> str:
+    def _creating_query(cursor: psycopg.cursor, table: str, schema, data,
+                        conflict: str = 'ON CONFLICT (id) DO NOTHING') -> str:
         """Функция создает запрос для бд postgres."""
         column_names = [field.name for field in fields(schema)]
         column_names_str = ', '.join(column_names)
         col_count = ', '.join(['%s'] * len(column_names))
+        values = row_getter(schema)
         bind_values = ','.join(
-            cursor.mogrify(f"({col_count})", astuple(row)) for row in data)
+            cursor.mogrify(f"({col_count})", values(row)) for row in data)
 
-        query = (f'INSERT INTO {table} ({column_names_str}) VALUES {bind_values} '
-                 f'ON CONFLICT (id) DO NOTHING')
+        query = f'INSERT INTO {table} ({column_names_str}) VALUES {bind_values} {conflict}'
         return query
 
+    @staticmethod
+    def _copy_data(cursor: psycopg.cursor, table: str, schema, data,
+                   conflict: str = 'ON CONFLICT (id) DO NOTHING') -> Tuple[int, int]:
+        """Функция записывает данные через бинарный COPY во временную таблицу.
+
+        Из временной таблицы строки переносятся одним INSERT ... SELECT,
+        поэтому поведение ON CONFLICT сохраняется.
+        Временная таблица очищается перед каждым COPY: в одной транзакции
+        пишется несколько частей пачки при делении пополам, и строки уже
+        записанной части иначе были бы вставлены повторно.
+        """
+        column_names_str = ', '.join(field.name for field in fields(schema))
+        staging = f'tmp_{table}'
+
+        cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS {staging} '
+                       f'(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS')
+        cursor.execute(f'TRUNCATE {staging}')
+        values = row_getter(schema)
+        writer = CountingWriter(cursor)
+        with cursor.copy(f'COPY {staging} ({column_names_str}) FROM STDIN (FORMAT BINARY)', writer=writer) as copy:
+            copy.set_types(pg_types(schema))
+            for row in data:
+                copy.write_row(values(row))
+        cursor.execute(f'INSERT INTO {table} ({column_names_str}) '
+                       f'SELECT {column_names_str} FROM {staging} {conflict}')
+        return cursor.rowcount, writer.bytes_sent
+
     @staticmethod
     def _clear_data_table(cursor: psycopg.cursor, table: str) -> None:
         """Функция удаляет данные из таблицы."""
@@ -93,44 +301,337 @@ class PostgresSaver:
 
 
 class SQLiteLoader:
-    def __init__(self, sqlite_connect: sqlite3.Cursor):
+    tables = [('genre', GenreSchema),
+              ('person', PersonSchema),
+              ('film_work', FilmWorkSchema),
+              ('genre_film_work', GenreFilmWorkSchema),
+              ('person_film_work', PersonFilmWorkSchema),
+              ]
+
+    def __init__(self, sqlite_connect: sqlite3.Cursor, sizer: Optional[BatchSizer] = None, readers: int = READERS):
         self.conn = sqlite_connect
-        self.tables = [('genre', GenreSchema),
-                       ('person', PersonSchema),
-                       ('film_work', FilmWorkSchema),
-                       ('genre_film_work', GenreFilmWorkSchema),
-                       ('person_film_work', PersonFilmWorkSchema),
-                       ]
-
-    def load_movies(self) -> List[dict]:
-        """Функция считывает данные из sqlite3."""
+        self.sizer = sizer or BatchSizer()
+        self.readers = readers
+
+    def load_movies(self, tables: Optional[List[Tuple[str, type]]] = None,
+                    checkpoints: Optional[Dict[str, Checkpoint]] = None,
+                    since: Optional[str] = None) -> Iterator[dict]:
+        """Функция считывает данные из sqlite3 по sizer.read_size строк и отдает пачки размера sizer.size.
+
+        Таблицы читаются в порядке self.tables, чтобы внешние ключи
+        связующих таблиц ссылались на уже записанные строки.
+        После последней пачки таблицы отдается отметка finished.
+        """
+        checkpoints = checkpoints or {}
         with closing(self.conn) as cursor:
             try:
-                data = []
-                for table, schema in self.tables:
-                    cursor.execute(f"SELECT * FROM {table}")
-                    data_values = []
-                    while data_table := [schema(*row) for row in cursor.fetchmany(SIZE)]:
-                        data_values.extend(data_table)
-                    data.append({'table': table, 'schema': schema, 'data': data_values})
-                return data
+                for table, schema in tables or self.tables:
+                    checkpoint = checkpoints.get(table) or Checkpoint(table_name=table)
+                    yield from self._load_table(cursor=cursor, table=table, schema=schema,
+                                                checkpoint=checkpoint, since=since, sizer=self.sizer,
+                                                readers=self.readers)
             except sqlite3.IntegrityError:
                 logging.error("Ошибка при загрузке данных из sqlite.")
+                raise
             except Exception as e:
                 logging.error(e)
+                raise
+
+    @staticmethod
+    def _load_table(cursor: sqlite3.Cursor, table: str, schema, checkpoint: Checkpoint,
+                    since: Optional[str], sizer: BatchSizer, readers: int = 1) -> Iterator[dict]:
+        """Функция считывает одну таблицу, начиная с контрольной точки.
+
+        Незавершенная таблица дочитывается с последнего записанного rowid.
+        Завершенная таблица пропускается, а при заданном since из нее
+        читаются только строки, измененные после since.
+        Прочитанные строки копятся и отдаются пачками ровно по
+        sizer.size(table) строк (последняя пачка таблицы может быть меньше),
+        даже если размер записи меньше размера чтения или не кратен ему.
+        Размер пачки записи может меняться между пачками. Контрольная точка
+        пачки - rowid ее последней строки.
+        При readers > 1 строки читаются несколькими потоками по диапазонам
+        rowid, но отдаются в том же порядке rowid.
+        """
+        ts_field = timestamp_field(schema)
+        ts_index = [field.name for field in fields(schema)].index(ts_field) + 1
+        convert = make_converter(schema)
+        last_rowid, batch_number, changed_since = checkpoint.last_rowid, checkpoint.batch, None
 
+        if checkpoint.finished:
+            if since is None:
+                logging.info(f"Таблица {table} уже загружена")
+                return
+            changed_since = checkpoint.last_modified if since == SINCE_LAST else since
+            last_rowid, batch_number = 0, 0
+            logging.info(f"Таблица {table}: загрузка строк, измененных после {changed_since}")
+        elif last_rowid:
+            logging.info(f"Таблица {table}: продолжение загрузки с rowid {last_rowid}, пачка {batch_number}")
 
-def load_from_sqlite(connection: sqlite3.Cursor, pg_conn: _connection):
-    """Основной метод загрузки данных из SQLite в Postgres"""
-    postgres_saver = PostgresSaver(pg_conn)
-    sqlite_loader = SQLiteLoader(connection)
+        chunks = SQLiteLoader._read_chunks(cursor, table, schema, last_rowid, ts_field, changed_since,
+                                           sizer.read_size, readers)
+        data_table, rowids, stamps, read_s, convert_s = [], [], [], 0.0, 0.0
+        while True:
+            started = time.perf_counter()
+            rows = next(chunks, [])
+            read = time.perf_counter()
+            read_s += read - started
+            if rows:
+                data_table.extend(convert(row[1:]) for row in rows)
+                rowids.extend(row[0] for row in rows)
+                # Отметка хранится в текстовом виде sqlite, чтобы сравнивать ее в запросе с since.
+                stamps.extend(row[ts_index] for row in rows)
+                convert_s += time.perf_counter() - read
 
-    data = sqlite_loader.load_movies()
-    postgres_saver.save_all_data(data)
+            start = 0
+            while len(data_table) - start >= (size := sizer.size(table)) or (not rows and start < len(data_table)):
+                end = min(start + size, len(data_table))
+                batch_number += 1
+                modified = max((value for value in stamps[start:end] if value is not None), default=None)
+                yield {'table': table, 'schema': schema, 'data': data_table[start:end], 'last_rowid': rowids[end - 1],
+                       'batch': batch_number, 'last_modified': modified, 'read_s': read_s, 'convert_s': convert_s}
+                read_s, convert_s, start = 0.0, 0.0, end
+            del data_table[:start], rowids[:start], stamps[:start]
+            if not rows:
+                break
+        yield {'table': table, 'schema': schema, 'data': [], 'finished': True}
+
+    @staticmethod
+    def _read_chunks(cursor: sqlite3.Cursor, table: str, schema, last_rowid: int, ts_field: str,
+                     changed_since: Optional[str], read_size: int, readers: int) -> Iterator[List[tuple]]:
+        """Функция читает строки таблицы после last_rowid пачками по read_size в порядке rowid.
+
+        Выбираются только колонки схемы. Если readers > 1, rowid до
+        максимального делятся на диапазоны по read_size, которые параллельно
+        читают readers потоков, каждый через свое подключение к файлу базы.
+        """
+        columns = select_columns(schema)
+        condition, params = '', []
+        if changed_since is not None:
+            condition, params = f" AND {ts_field} > ?", [changed_since]
+
+        file_name = database_file(cursor) if readers > 1 else None
+        if file_name is not None:
+            max_rowid = cursor.execute(f"SELECT max(rowid) FROM {table}").fetchone()[0] or 0
+            logging.info(f"Таблица {table}: чтение rowid {last_rowid}-{max_rowid} в {readers} потоков")
+            yield from parallel_chunks(
+                file_name, f"SELECT rowid, {columns} FROM {table} WHERE rowid > ? AND rowid <= ?{condition} "
+                           f"ORDER BY rowid", params, last_rowid, max_rowid, read_size, readers)
+            return
+
+        cursor.execute(f"SELECT rowid, {columns} FROM {table} WHERE rowid > ?{condition} ORDER BY rowid",
+                       [last_rowid, *params])
+        while rows := cursor.fetchmany(read_size):
+            yield rows
+
+
+def prepare_batches(data: Iterable[dict], deduplicator: Optional[Deduplicator] = None,
+                    validator: Optional[ReferenceValidator] = None) -> Iterable[dict]:
+    """Функция добавляет к потоку пачек загрузчика удаление дублей и проверку ссылок."""
+    if deduplicator is not None:
+        data = deduplicator.deduplicate(data)
+    if validator is not None:
+        data = validator.validate(data)
+    return data
+
+
+def prepare_checkpoints(pg_conn: _connection, reset: bool = False) -> Tuple[CheckpointStore, Dict[str, Checkpoint]]:
+    """Функция создает хранилище контрольных точек и читает сохраненный прогресс."""
+    checkpoints = CheckpointStore(pg_conn)
+    checkpoints.ensure()
+    if reset:
+        checkpoints.reset(table for table, _ in SQLiteLoader.tables)
+    return checkpoints, checkpoints.load()
+
+
+def load_from_sqlite(connection: sqlite3.Cursor, pg_conn: _connection, mode: str = WRITE_MODE,
+                     since: Optional[str] = None, reset: bool = False, metrics: Optional[MigrationMetrics] = None,
+                     sizer: Optional[BatchSizer] = None, dead_letter: Optional[DeadLetterFile] = None,
+                     readers: int = READERS, validator: Optional[ReferenceValidator] = None,
+                     deduplicator: Optional[Deduplicator] = None, conflict: str = CONFLICT) -> bool:
+    """Основной метод загрузки данных из SQLite в Postgres. Возвращает False, если загрузка прервалась."""
+    started = time.perf_counter()
+    sizer = sizer or BatchSizer()
+    checkpoints, progress = prepare_checkpoints(pg_conn, reset=reset)
+    if validator is not None:
+        validator.seed(pg_conn)
+    postgres_saver = PostgresSaver(pg_conn, mode=mode, checkpoints=checkpoints, upsert=since is not None,
+                                   metrics=metrics, sizer=sizer, dead_letter=dead_letter, conflict=conflict)
+    sqlite_loader = SQLiteLoader(connection, sizer=sizer, readers=readers)
+
+    data = sqlite_loader.load_movies(checkpoints=progress, since=since)
+    saved = postgres_saver.save_all_data(prepare_batches(data, deduplicator, validator))
+    logging.info(f"Перенос ({mode}) за {time.perf_counter() - started:.2f} с")
+    return saved
+
+
+def load_parallel(file_name: str, workers: int, mode: str = WRITE_MODE, since: Optional[str] = None,
+                  reset: bool = False, metrics: Optional[MigrationMetrics] = None,
+                  sizer: Optional[BatchSizer] = None,
+                  dead_letter: Optional[DeadLetterFile] = None, readers: int = READERS,
+                  validator: Optional[ReferenceValidator] = None, deduplicator: Optional[Deduplicator] = None,
+                  conflict: str = CONFLICT) -> bool:
+    """Функция загружает независимые таблицы параллельно на пуле из workers потоков.
+
+    Каждый поток работает через своё подключение к postgres и к sqlite.
+    Размер пачки sizer подбирает для каждой таблицы отдельно, поэтому
+    один sizer можно использовать во всех потоках. Индексы id validator
+    тоже общие: связующая таблица начинает загружаться только после того,
+    как родительские таблицы целиком прошли через validator.
+    Возвращает False, если хотя бы одна таблица не загружена: из-за ошибки
+    чтения или записи либо потому, что не загружена ее родительская таблица.
+    """
+    tables = SQLiteLoader.tables
+    sizer = sizer or BatchSizer()
+    with psycopg.connect(**dsl, row_factory=dict_row, cursor_factory=ClientCursor) as pg_conn:
+        checkpoints, progress = prepare_checkpoints(pg_conn, reset=reset)
+        if validator is not None:
+            validator.seed(pg_conn)
+    connections = WorkerConnections(
+        lambda: psycopg.connect(**dsl, row_factory=dict_row, cursor_factory=ClientCursor)
+    )
+
+    def load_table(table: str, schema: type) -> bool:
+        with open_db(file_name=file_name) as sqlite_connect:
+            sqlite_loader = SQLiteLoader(sqlite_connect, sizer=sizer, readers=readers)
+            postgres_saver = PostgresSaver(connections.get(), mode=mode, checkpoints=checkpoints,
+                                           upsert=since is not None, metrics=metrics, sizer=sizer,
+                                           dead_letter=dead_letter, conflict=conflict)
+            data = sqlite_loader.load_movies(tables=[(table, schema)], checkpoints=progress, since=since)
+            return postgres_saver.save_all_data(prepare_batches(data, deduplicator, validator))
+
+    scheduler = TableScheduler(tables, build_dependencies(tables), workers=workers)
+    try:
+        timings = scheduler.run(load_table)
+    finally:
+        connections.close_all()
+    for table, elapsed in timings.items():
+        logging.info(f"{table}: {elapsed:.2f} с")
+    if scheduler.failed:
+        logging.error(f"Не загружены таблицы: {', '.join(sorted(scheduler.failed))}")
+    return not scheduler.failed
+
+
+def report_metrics(metrics: MigrationMetrics, dead_letter: DeadLetterFile,
+                   validator: Optional[ReferenceValidator] = None,
+                   deduplicator: Optional[Deduplicator] = None) -> None:
+    """Функция закрывает файлы показателей и выводит итоговую таблицу в лог и stdout."""
+    metrics.close()
+    dead_letter.close()
+    if deduplicator is not None:
+        deduplicator.close()
+    summary = metrics.summary()
+    if dead_letter.rejected:
+        summary += f"\nОтклоненные строки записаны в {dead_letter.path}: {dead_letter.rejected}"
+    if validator is not None and validator.found:
+        summary += f"\nСтроки без родителя ({validator.orphans}): {validator.found}"
+    if deduplicator is not None and deduplicator.collapsed:
+        summary += f"\nУбрано дублей естественного ключа: {deduplicator.collapsed}"
+    logging.info(f"Итоги загрузки:\n{summary}")
+    print(summary)
+
+
+def parse_args() -> argparse.Namespace:
+    """Функция разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description='Перенос данных из SQLite в Postgres.')
+    parser.add_argument('--mode', choices=WRITE_MODES, default=WRITE_MODE,
+                        help='способ записи в postgres: INSERT или COPY')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help='количество потоков для параллельной загрузки независимых таблиц')
+    parser.add_argument('--since', metavar='MODIFIED',
+                        help=f'загрузить только строки, измененные после MODIFIED; '
+                             f'{SINCE_LAST} - после прошлого запуска')
+    parser.add_argument('--reset', action='store_true',
+                        help='сбросить контрольные точки и загрузить все таблицы заново')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='читать sqlite в отдельном потоке и писать в postgres через AsyncConnection')
+    parser.add_argument('--queue', type=int, default=QUEUE_SIZE,
+                        help='сколько прочитанных пачек может ждать записи в асинхронном режиме')
+    parser.add_argument('--metrics', metavar='FILE', default=METRICS_FILE,
+                        help='файл для показателей каждой пачки в формате JSON lines ("-" - stdout)')
+    parser.add_argument('--prometheus', metavar='FILE', default=PROMETHEUS_FILE,
+                        help='файл с итогами по таблицам в текстовом формате Prometheus')
+    parser.add_argument('--readers', type=int, default=READERS,
+                        help='количество потоков чтения одной таблицы sqlite по диапазонам rowid')
+    parser.add_argument('--read-size', type=int, default=READ_SIZE, help='сколько строк читать из sqlite за раз')
+    parser.add_argument('--write-size', type=int, default=WRITE_SIZE, help='сколько строк записывать одной пачкой')
+    parser.add_argument('--write-sizes', metavar='TABLE=N,...', default=WRITE_SIZES,
+                        help='размер пачки записи отдельных таблиц, например film_work=500,genre_film_work=5000')
+    parser.add_argument('--adaptive', action='store_true', default=BATCH_ADAPTIVE,
+                        help=f'подбирать размер пачки записи от {BATCH_MIN} до {BATCH_MAX} строк '
+                             f'по времени commit ({BATCH_TARGET_SECONDS} с) и объему пачки ({BATCH_MAX_MB} МБ)')
+    parser.add_argument('--dead-letter', metavar='FILE', default=DEAD_LETTER_FILE,
+                        help='файл JSON lines для строк, которые отклонил postgres')
+    parser.add_argument('--id-index', choices=ID_INDEXES, default=ID_INDEX,
+                        help='проверять ссылки связующих таблиц по индексу id: точное множество, '
+                             'фильтр Блума или не проверять')
+    parser.add_argument('--id-capacity', type=int, default=ID_INDEX_CAPACITY,
+                        help='ожидаемое количество id в таблице для фильтра Блума')
+    parser.add_argument('--orphans', choices=ORPHAN_MODES, default=ORPHANS,
+                        help='строки без родителя: убрать и записать в dead letter или только записать в лог')
+    parser.add_argument('--dedup', action='store_true', default=DEDUP,
+                        help='убирать строки связующих таблиц с повторным естественным ключом до записи')
+    parser.add_argument('--dedup-keys', type=int, default=DEDUP_MAX_KEYS,
+                        help='сколько ключей таблицы держать в памяти, прежде чем сбросить их на диск')
+    parser.add_argument('--conflict', choices=CONFLICT_TARGETS, default=CONFLICT,
+                        help='пропускать конфликты только по id или и по уникальным индексам связующих таблиц')
+    args = parser.parse_args()
+    if args.use_async and args.workers > 1:
+        parser.error('--async и --workers нельзя использовать вместе')
+    return args
+
+
+def make_validator(args: argparse.Namespace) -> Optional[ReferenceValidator]:
+    """Функция создает проверку ссылок по аргументам командной строки."""
+    if args.id_index == 'none':
+        return None
+    return ReferenceValidator(SQLiteLoader.tables, index=args.id_index, orphans=args.orphans,
+                              capacity=args.id_capacity)
+
+
+def make_deduplicator(args: argparse.Namespace) -> Optional[Deduplicator]:
+    """Функция создает удаление дублей по аргументам командной строки."""
+    return Deduplicator(max_keys=args.dedup_keys) if args.dedup else None
+
+
+def make_sizer(args: argparse.Namespace) -> BatchSizer:
+    """Функция создает BatchSizer по аргументам командной строки."""
+    return BatchSizer(read_size=args.read_size, size=args.write_size, sizes=parse_sizes(args.write_sizes),
+                      adaptive=args.adaptive)
 
 
 if __name__ == '__main__':
-    with open_db(file_name='db.sqlite') as sqlite_connect, psycopg.connect(
-            **dsl, row_factory=dict_row, cursor_factory=ClientCursor
-    ) as pg_conn:
-        load_from_sqlite(connection=sqlite_connect, pg_conn=pg_conn)
+    args = parse_args()
+    metrics = MigrationMetrics(jsonl_path=args.metrics, prometheus_path=args.prometheus)
+    sizer = make_sizer(args)
+    dead_letter = DeadLetterFile(args.dead_letter)
+    validator = make_validator(args)
+    deduplicator = make_deduplicator(args)
+    saved = False
+    try:
+        if args.use_async:
+            import asyncio
+
+            from async_load_data import async_load_from_sqlite
+
+            saved = asyncio.run(async_load_from_sqlite(file_name='db.sqlite', mode=args.mode, since=args.since,
+                                                       reset=args.reset, queue_size=args.queue, metrics=metrics,
+                                                       sizer=sizer, dead_letter=dead_letter,
+                                                       readers=args.readers, validator=validator,
+                                                       deduplicator=deduplicator, conflict=args.conflict))
+        elif args.workers > 1:
+            saved = load_parallel(file_name='db.sqlite', workers=args.workers, mode=args.mode,
+                                  since=args.since, reset=args.reset, metrics=metrics, sizer=sizer,
+                                  dead_letter=dead_letter, readers=args.readers, validator=validator,
+                                  deduplicator=deduplicator, conflict=args.conflict)
+        else:
+            with open_db(file_name='db.sqlite') as sqlite_connect, psycopg.connect(
+                    **dsl, row_factory=dict_row, cursor_factory=ClientCursor
+            ) as pg_conn:
+                saved = load_from_sqlite(connection=sqlite_connect, pg_conn=pg_conn, mode=args.mode,
+                                         since=args.since, reset=args.reset, metrics=metrics, sizer=sizer,
+                                         dead_letter=dead_letter, readers=args.readers, validator=validator,
+                                         deduplicator=deduplicator, conflict=args.conflict)
+    finally:
+        report_metrics(metrics, dead_letter, validator, deduplicator)
+    sys.exit(0 if saved else 1)
@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Как часто переписывать файл Prometheus, секунд: при пачках по SIZE строк
+# запись после каждой пачки заняла бы заметную долю времени.
+PROMETHEUS_INTERVAL = 5
+
+PROMETHEUS_METRICS = (
+    ('rows_read', 'counter', 'Строки, прочитанные из sqlite.'),
+    ('rows_written', 'counter', 'Строки, записанные в postgres.'),
+    ('rows_skipped', 'counter', 'Строки, пропущенные ON CONFLICT.'),
+    ('rows_rejected', 'counter', 'Строки, отклоненные postgres и записанные в dead letter.'),
+    ('bytes_sent', 'counter', 'Байты, отправленные в postgres.'),
+    ('batches', 'counter', 'Записанные пачки.'),
+)
+
+
+@dataclass
+class TableMetrics:
+    table: str
+    batches: int = 0
+    max_batch: int = 0
+    rows_read: int = 0
+    rows_written: int = 0
+    rows_skipped: int = 0
+    rows_rejected: int = 0
+    bytes_sent: int = 0
+    read_s: float = 0.0
+    convert_s: float = 0.0
+    write_s: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.read_s + self.convert_s + self.write_s
+        return self.rows_read / elapsed if elapsed else 0.0
+
+
+class MigrationMetrics:
+    """Собирает показатели загрузки по таблицам и пачкам.
+
+    Каждая пачка пишется строкой JSON в jsonl_path ('-' - в stdout), итоги
+    по таблицам - в файл Prometheus в текстовом формате, который можно
+    читать во время работы (например, через textfile collector node_exporter).
+    Методы потокобезопасны: один объект используется всеми потоками загрузки.
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        self.tables: Dict[str, TableMetrics] = {}
+        self.prometheus_path = prometheus_path
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._prometheus_written = 0.0
+        if jsonl_path == '-':
+            self._jsonl = sys.stdout
+        else:
+            self._jsonl = open(jsonl_path, 'a', buffering=1, encoding='utf-8') if jsonl_path else None
+
+    def record_batch(self, table: str, batch: int, rows_read: int, rows_written: int, bytes_sent: int,
+                     read_s: float, convert_s: float, write_s: float, rows_rejected: int = 0) -> None:
+        """Функция учитывает записанную пачку."""
+        rows_skipped = rows_read - rows_written - rows_rejected
+        with self._lock:
+            totals = self.tables.setdefault(table, TableMetrics(table=table))
+            totals.batches += 1
+            totals.max_batch = max(totals.max_batch, rows_read)
+            totals.rows_read += rows_read
+            totals.rows_written += rows_written
+            totals.rows_skipped += rows_skipped
+            totals.rows_rejected += rows_rejected
+            totals.bytes_sent += bytes_sent
+            totals.read_s += read_s
+            totals.convert_s += convert_s
+            totals.write_s += write_s
+
+            if self._jsonl is not None:
+                self._jsonl.write(json.dumps({
+                    'ts': round(time.time(), 3), 'table': table, 'batch': batch,
+                    'rows_read': rows_read, 'rows_written': rows_written, 'rows_skipped': rows_skipped,
+                    'rows_rejected': rows_rejected, 'bytes_sent': bytes_sent, 'read_s': round(read_s, 6), 'convert_s': round(convert_s, 6),
+                    'write_s': round(write_s, 6),
+                }) + '\n')
+            if self.prometheus_path and time.monotonic() - self._prometheus_written >= PROMETHEUS_INTERVAL:
+                self._write_prometheus()
+
+    def summary(self) -> str:
+        """Функция возвращает итоговую таблицу по всем таблицам.
+
+        avg rows и max rows - средний и наибольший размер записанных пачек.
+        """
+        header = (f"{'table':<18}{'batches':>9}{'avg rows':>10}{'max rows':>10}{'read':>11}{'written':>11}"
+                  f"{'skipped':>11}{'rejected':>10}{'MB sent':>10}{'read s':>9}{'conv s':>9}{'write s':>9}{'rows/s':>11}")
+        lines = [header, '-' * len(header)]
+        with self._lock:
+            for totals in self.tables.values():
+                average = totals.rows_read / totals.batches if totals.batches else 0
+                lines.append(
+                    f'{totals.table:<18}{totals.batches:>9}{average:>10.0f}{totals.max_batch:>10}'
+                    f'{totals.rows_read:>11}{totals.rows_written:>11}{totals.rows_skipped:>11}'
+                    f'{totals.rows_rejected:>10}{totals.bytes_sent / 2 ** 20:>10.1f}{totals.read_s:>9.2f}'
+                    f'{totals.convert_s:>9.2f}{totals.write_s:>9.2f}{totals.rows_per_second:>11.0f}'
+                )
+        return '\n'.join(lines)
+
+    def close(self) -> None:
+        """Функция дописывает итоговый файл Prometheus и закрывает файл JSON."""
+        with self._lock:
+            if self.prometheus_path:
+                self._write_prometheus()
+            if self._jsonl is not None and self._jsonl is not sys.stdout:
+                self._jsonl.close()
+            self._jsonl = None
+
+    def _write_prometheus(self) -> None:
+        """Функция атомарно переписывает файл Prometheus, чтобы сборщик не прочитал его наполовину."""
+        lines = []
+        for name, kind, help_text in PROMETHEUS_METRICS:
+            lines += [f'# HELP migration_{name}_total {help_text}', f'# TYPE migration_{name}_total {kind}']
+            lines += [f'migration_{name}_total{{table="{table}"}} {getattr(totals, name)}'
+                      for table, totals in self.tables.items()]
+        lines += ['# HELP migration_stage_seconds_total Время этапов загрузки.',
+                  '# TYPE migration_stage_seconds_total counter']
+        for table, totals in self.tables.items():
+            for stage in ('read', 'convert', 'write'):
+                lines.append(f'migration_stage_seconds_total{{table="{table}",stage="{stage}"}} '
+                             f'{getattr(totals, f"{stage}_s"):.6f}')
+        lines += ['# HELP migration_start_time_seconds Время запуска загрузки.',
+                  '# TYPE migration_start_time_seconds gauge',
+                  f'migration_start_time_seconds {self.started:.3f}',
+                  '# HELP migration_last_update_time_seconds Время последнего обновления файла.',
+                  '# TYPE migration_last_update_time_seconds gauge',
+                  f'migration_last_update_time_seconds {time.time():.3f}']
+
+        tmp_path = f'{self.prometheus_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.prometheus_path)
+        self._prometheus_written = time.monotonic()
@@ -0,0 +1,135 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import fields
+from pathlib import Path
+from typing import Callable, Dict, List, Set, Tuple
+
+DDL_PATH = Path(__file__).resolve().parent.parent / 'schema_design' / 'movies_database.ddl'
+
+TABLE_PATTERN = re.compile(r'CREATE TABLE IF NOT EXISTS content\.(\w+)\s*\((.*?)\);', re.S | re.I)
+REFERENCE_PATTERN = re.compile(r'REFERENCES content\.(\w+)', re.I)
+
+
+def ddl_dependencies(ddl_path: Path = DDL_PATH) -> Dict[str, Set[str]]:
+    """Функция находит внешние ключи таблиц в DDL-файле."""
+    ddl = ddl_path.read_text(encoding='utf-8')
+    return {
+        table: set(REFERENCE_PATTERN.findall(body)) - {table}
+        for table, body in TABLE_PATTERN.findall(ddl)
+    }
+
+
+def schema_dependencies(tables: List[Tuple[str, type]]) -> Dict[str, Set[str]]:
+    """Функция находит ссылки между таблицами по полям *_id в dataclass-схемах."""
+    names = {table for table, _ in tables}
+    dependencies = {}
+    for table, schema in tables:
+        parents = {field.name[:-len('_id')] for field in fields(schema) if field.name.endswith('_id')}
+        dependencies[table] = (parents & names) - {table}
+    return dependencies
+
+
+def build_dependencies(tables: List[Tuple[str, type]], ddl_path: Path = DDL_PATH) -> Dict[str, Set[str]]:
+    """Функция строит граф зависимостей таблиц по схемам и DDL."""
+    names = {table for table, _ in tables}
+    dependencies = schema_dependencies(tables)
+    if ddl_path.exists():
+        for table, parents in ddl_dependencies(ddl_path).items():
+            if table in dependencies:
+                dependencies[table] |= parents & names
+    else:
+        logging.warning(f"DDL-файл {ddl_path} не найден, зависимости берутся только из схем")
+    return dependencies
+
+
+class WorkerConnections:
+    """Одно подключение к postgres на каждый поток пула."""
+
+    def __init__(self, connect: Callable):
+        self.connect = connect
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def get(self):
+        """Функция возвращает подключение текущего потока, создавая его при первом обращении."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close_all(self) -> None:
+        """Функция закрывает подключения всех потоков."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+class TableScheduler:
+    """Запускает загрузку таблиц на пуле потоков в порядке внешних ключей.
+
+    Таблица отправляется в пул, как только загружены все таблицы,
+    на которые она ссылается. Если загрузка таблицы не удалась (task
+    вернул False или бросил исключение, например при ошибке чтения),
+    зависящие от неё таблицы пропускаются. Неудавшиеся и пропущенные
+    таблицы после run перечислены в failed.
+    """
+
+    def __init__(self, tables: List[Tuple[str, type]], dependencies: Dict[str, Set[str]], workers: int = 1):
+        if workers < 1:
+            raise ValueError("Количество потоков должно быть больше нуля")
+        self.tables = tables
+        self.dependencies = dependencies
+        self.workers = workers
+        self.failed: Set[str] = set()
+
+    def run(self, task: Callable[[str, type], bool]) -> Dict[str, float]:
+        """Функция выполняет task для каждой таблицы и возвращает время загрузки таблиц в секундах."""
+        schemas = dict(self.tables)
+        pending = {table: set(self.dependencies.get(table, ())) for table, _ in self.tables}
+        running = {}
+        timings = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='loader') as pool:
+            def submit_ready():
+                for table in [table for table, parents in pending.items() if not parents]:
+                    del pending[table]
+                    running[pool.submit(self._timed, task, table, schemas[table])] = table
+
+            submit_ready()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    table = running.pop(future)
+                    success, timings[table] = future.result()
+                    if success:
+                        for parents in pending.values():
+                            parents.discard(table)
+                    else:
+                        self.failed.add(table)
+                submit_ready()
+
+        for table, parents in pending.items():
+            logging.error(f"Таблица {table} пропущена: не загружены таблицы {', '.join(sorted(parents))}")
+            self.failed.add(table)
+        return timings
+
+    @staticmethod
+    def _timed(task: Callable[[str, type], bool], table: str, schema: type) -> Tuple[bool, float]:
+        """Функция выполняет загрузку таблицы и замеряет её время."""
+        started = time.perf_counter()
+        try:
+            success = task(table, schema)
+        except Exception as e:
+            logging.error(f"Ошибка при загрузке таблицы {table}: {e}")
+            success = False
+        elapsed = time.perf_counter() - started
+        logging.info(f"Таблица {table} загружена за {elapsed:.2f} с" if success
+                     else f"Загрузка таблицы {table} прервана через {elapsed:.2f} с")
+        return success, elapsed
@@ -2,4 +2,5 @@ from .genre import Genre
 from .person import Person
 from .film_work import FilmWork
 from .genre_film_work import GenreFilmWork
-from .person_film_work import PersonFilmWork
\ No newline at end of file
+from .person_film_work import PersonFilmWork
+from .converters import SQLITE_TYPES, make_converter, row_getter, pg_types
@@ -0,0 +1,71 @@
+from dataclasses import fields
+from datetime import date, datetime
+from functools import lru_cache
+from operator import attrgetter
+from typing import Callable, List, Optional
+from uuid import UUID
+
+
+def parse_datetime(value: str) -> datetime:
+    """Функция разбирает метку времени из sqlite вида 2021-06-16 20:14:09.221838+00."""
+    if value[-3] in '+-':
+        value += ':00'
+    return datetime.fromisoformat(value)
+
+
+# Функции приведения текста из sqlite к типам полей схем.
+PARSERS = {
+    UUID: UUID,
+    datetime: parse_datetime,
+    date: date.fromisoformat,
+    float: float,
+}
+
+# Типы postgres для бинарного COPY.
+PG_TYPES = {
+    UUID: 'uuid',
+    str: 'text',
+    datetime: 'timestamptz',
+    date: 'date',
+    float: 'float8',
+}
+
+# Типы колонок sqlite, остальные поля хранятся как TEXT.
+SQLITE_TYPES = {
+    date: 'DATE',
+    float: 'FLOAT',
+}
+
+
+@lru_cache(maxsize=None)
+def make_converter(schema) -> Callable[[tuple], object]:
+    """Функция собирает для схемы преобразователь строки sqlite в dataclass.
+
+    Поля, которые нужно приводить, определяются один раз по аннотациям схемы.
+    Преобразуются только строковые значения, None и уже приведенные значения
+    передаются как есть.
+    """
+    steps = [(index, PARSERS[field.type]) for index, field in enumerate(fields(schema))
+             if field.type in PARSERS]
+
+    def convert(row: tuple):
+        values = list(row)
+        for index, parse in steps:
+            value = values[index]
+            if value.__class__ is str:
+                values[index] = parse(value)
+        return schema(*values)
+
+    return convert
+
+
+@lru_cache(maxsize=None)
+def row_getter(schema) -> Callable[[object], tuple]:
+    """Функция возвращает получение кортежа значений полей без копирования, в отличие от astuple."""
+    return attrgetter(*(field.name for field in fields(schema)))
+
+
+@lru_cache(maxsize=None)
+def pg_types(schema) -> List[Optional[str]]:
+    """Функция возвращает типы postgres полей схемы."""
+    return [PG_TYPES.get(field.type) for field in fields(schema)]
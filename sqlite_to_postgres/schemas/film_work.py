@@ -1,11 +1,11 @@
 from dataclasses import dataclass
 from datetime import date, datetime
-from uuid import uuid4
+from uuid import UUID
 
 
-@dataclass
+@dataclass(slots=True)
 class FilmWork:
-    id: uuid4
+    id: UUID
     title: str
     description: str
     creation_date: date
@@ -1,11 +1,11 @@
 from dataclasses import dataclass
 from datetime import datetime
-from uuid import uuid4
+from uuid import UUID
 
 
-@dataclass
+@dataclass(slots=True)
 class Genre:
-    id: uuid4
+    id: UUID
     name: str
     description: str
     created: datetime
@@ -1,11 +1,11 @@
 from dataclasses import dataclass
 from datetime import datetime
-from uuid import uuid4
+from uuid import UUID
 
 
-@dataclass
+@dataclass(slots=True)
 class GenreFilmWork:
-    id: uuid4
-    film_work_id: uuid4
-    genre_id: uuid4
+    id: UUID
+    film_work_id: UUID
+    genre_id: UUID
     created: datetime
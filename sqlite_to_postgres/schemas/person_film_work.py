@@ -1,12 +1,12 @@
 from dataclasses import dataclass
 from datetime import datetime
-from uuid import uuid4
+from uuid import UUID
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonFilmWork:
-    id: uuid4
-    film_work_id: uuid4
-    person_id: uuid4
+    id: UUID
+    film_work_id: UUID
+    person_id: UUID
     role: str
     created: datetime
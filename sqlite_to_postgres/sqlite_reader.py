@@ -0,0 +1,107 @@
+import queue
+import sqlite3
+import threading
+from dataclasses import fields
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from config import READ_QUEUE, SQLITE_CACHE_MB, SQLITE_MMAP_MB
+
+# Как часто поток чтения проверяет остановку, пока ждет места в очереди, секунд.
+POLL_INTERVAL = 0.1
+
+
+def connect_sqlite(file_name: str, mmap_mb: int = SQLITE_MMAP_MB, cache_mb: int = SQLITE_CACHE_MB) -> sqlite3.Connection:
+    """Функция открывает базу sqlite только для чтения и настраивает ее для последовательного чтения.
+
+    mode=ro не дает случайно изменить исходную базу и не создает пустой
+    файл, если базы нет. mmap_size позволяет читать страницы из отображенного
+    в память файла без копирования в кеш страниц sqlite, cache_size задается
+    в мегабайтах (отрицательное значение pragma - в килобайтах).
+    """
+    uri = f'{Path(file_name).resolve().as_uri()}?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.execute(f'PRAGMA mmap_size = {mmap_mb * 2 ** 20}')
+    conn.execute(f'PRAGMA cache_size = {-cache_mb * 1024}')
+    return conn
+
+
+def database_file(cursor: sqlite3.Cursor) -> Optional[str]:
+    """Функция возвращает путь к файлу основной базы подключения, None для базы в памяти."""
+    for _, name, file in cursor.execute('PRAGMA database_list').fetchall():
+        if name == 'main':
+            return file or None
+    return None
+
+
+def select_columns(schema) -> str:
+    """Функция возвращает колонки sqlite в порядке полей схемы вместо *."""
+    return ', '.join(field.name for field in fields(schema))
+
+
+def rowid_ranges(start: int, end: int, width: int) -> List[Tuple[int, int]]:
+    """Функция делит rowid в (start, end] на диапазоны по width rowid."""
+    return [(low, min(low + width, end)) for low in range(start, end, width)]
+
+
+def _put(out: queue.Queue, item, stop: threading.Event) -> bool:
+    """Функция кладет элемент в очередь, пока не выставлен stop. Возвращает False при остановке."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _scan_ranges(file_name: str, query: str, params: Sequence, ranges: List[Tuple[int, int]],
+                 out: queue.Queue, stop: threading.Event) -> None:
+    """Функция читает свои диапазоны rowid через отдельное подключение и кладет строки в очередь."""
+    try:
+        conn = connect_sqlite(file_name)
+        try:
+            for low, high in ranges:
+                if not _put(out, conn.execute(query, (low, high, *params)).fetchall(), stop):
+                    return
+        finally:
+            conn.close()
+    except Exception as e:
+        _put(out, e, stop)
+
+
+def parallel_chunks(file_name: str, query: str, params: Sequence, start: int, end: int, width: int,
+                    readers: int, depth: int = READ_QUEUE) -> Iterator[List[tuple]]:
+    """Функция читает rowid (start, end] несколькими потоками и отдает строки в порядке rowid.
+
+    query должен начинаться условием rowid > ? AND rowid <= ?, остальные
+    параметры передаются в params. Диапазоны по width rowid раздаются
+    потокам по кругу: поток i читает диапазоны i, i + readers, ...
+    Порядок строк совпадает с однопоточным чтением, поэтому контрольные
+    точки по rowid остаются верными. Каждый поток опережает запись не
+    больше чем на depth диапазонов, так что в памяти не больше
+    readers * depth * width строк.
+    """
+    ranges = rowid_ranges(start, end, width)
+    readers = max(1, min(readers, len(ranges)))
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=depth) for _ in range(readers)]
+    threads = [
+        threading.Thread(target=_scan_ranges, args=(file_name, query, params, ranges[index::readers],
+                                                    queues[index], stop),
+                         name=f'sqlite-reader-{index}', daemon=True)
+        for index in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for index in range(len(ranges)):
+            rows = queues[index % readers].get()
+            if isinstance(rows, Exception):
+                raise rows
+            if rows:
+                yield rows
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -1,9 +1,24 @@
 import datetime
+import json
 import re
+import sqlite3
+import tracemalloc
 import uuid
 
 import pytest
 
+from batching import BatchSizer, parse_sizes
+from benchmarks.generate import generate
+from dead_letter import DeadLetterFile
+from dedup import Deduplicator
+from export_data import SQLiteExporter, export_tables
+from load_data import PostgresSaver, SQLiteLoader, open_db
+from metrics import MigrationMetrics
+from scheduler import TableScheduler, build_dependencies
+from schemas import FilmWork, PersonFilmWork
+from validation import BloomIdIndex, IdSet, OrphanError
+from verify import verify_table
+
 
 @pytest.mark.parametrize('table', ['genre', 'person', 'film_work', 'person_film_work', 'genre_film_work'])
 def test_check_tables(table, sqlite_cursor, postgres_cursor):
@@ -54,3 +69,201 @@ def test_check_data_person_film_work(table, sqlite_cursor, postgres_cursor):
             postgres_row_list.append(postgres_val)
         postgres_list.append(tuple(postgres_row_list))
     assert sqlite_list == postgres_list
+
+
+@pytest.mark.parametrize('table', ['genre', 'person', 'film_work', 'person_film_work', 'genre_film_work'])
+def test_verify_table(table, sqlite_cursor, postgres_cursor):
+    schema = dict(SQLiteLoader.tables)[table]
+    mismatches = verify_table(sqlite_cursor.connection, postgres_cursor.connection, table, schema, rows=True)
+    assert mismatches == []
+
+
+def test_export_round_trip(tmp_path, postgres_cursor):
+    exporter = SQLiteExporter(str(tmp_path / 'export.sqlite'))
+    try:
+        results = export_tables(postgres_cursor.connection, exporter, chunk_size=1000)
+    finally:
+        exporter.close()
+    with sqlite3.connect(tmp_path / 'export.sqlite') as sqlite_conn:
+        for export in results:
+            schema = dict(SQLiteLoader.tables)[export.table]
+            assert verify_table(sqlite_conn, postgres_cursor.connection, export.table, schema) == []
+
+
+@pytest.mark.parametrize('table', ['genre', 'person', 'film_work', 'person_film_work', 'genre_film_work'])
+def test_parallel_read_order(table, sqlite_cursor):
+    tables = [(table, dict(SQLiteLoader.tables)[table])]
+    sizer = BatchSizer(read_size=50, size=200)
+    single = [batch['data'] for batch in SQLiteLoader(sqlite_cursor, sizer=sizer, readers=1).load_movies(tables)]
+    with open_db(file_name='db.sqlite') as cursor:
+        parallel = [batch['data'] for batch in SQLiteLoader(cursor, sizer=sizer, readers=4).load_movies(tables)]
+    assert parallel == single
+
+
+def test_id_set_memory_per_million():
+    ids = [uuid.uuid4() for _ in range(1_000_000)]
+    tracemalloc.start()
+    index = IdSet()
+    for value in ids:
+        index.add(value)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert used < 100 * 2 ** 20
+    assert all(value in index for value in ids[:10_000])
+    assert uuid.uuid4() not in index
+
+
+def test_bloom_id_index_memory_and_error_rate():
+    capacity = 100_000
+    index = BloomIdIndex(capacity=capacity, error_rate=0.01)
+    ids = [uuid.uuid4() for _ in range(capacity)]
+    for value in ids:
+        index.add(value)
+    # 9.6 бита на id при 1% ложных срабатываний: 1.2 МБ на миллион id.
+    assert index.nbytes * 1_000_000 / capacity < 1.25 * 2 ** 20
+    assert all(value in index for value in ids)
+    false_positives = sum(uuid.uuid4() in index for _ in range(capacity))
+    assert false_positives / capacity < 0.02
+
+
+@pytest.mark.parametrize('max_keys', [1_000_000, 10])
+def test_deduplicate_natural_key(max_keys):
+    films, persons = [uuid.uuid4() for _ in range(5)], [uuid.uuid4() for _ in range(5)]
+    created = datetime.datetime(2021, 6, 16, tzinfo=datetime.timezone.utc)
+    rows = [PersonFilmWork(uuid.uuid4(), film, person, role, created)
+            for film in films for person in persons for role in ('actor', 'director')]
+    batches = [{'table': 'person_film_work', 'data': rows[start:start + 15], 'batch': number}
+               for number, start in enumerate(range(0, len(rows), 15))]
+    duplicates = [{'table': 'person_film_work', 'data': [PersonFilmWork(uuid.uuid4(), row.film_work_id, row.person_id,
+                                                                        row.role, created) for row in rows[::3]]}]
+    deduplicator = Deduplicator(max_keys=max_keys)
+    kept = [row for batch in deduplicator.deduplicate(batches + duplicates) for row in batch['data']]
+    deduplicator.close()
+    assert kept == rows
+    assert deduplicator.collapsed == {'person_film_work': len(rows[::3])}
+
+
+def test_parse_sizes():
+    assert parse_sizes('film_work=500, genre_film_work=5000,') == {'film_work': 500, 'genre_film_work': 5000}
+    assert parse_sizes(None) == {}
+
+
+def test_batch_sizer_doubles_and_halves():
+    sizer = BatchSizer(adaptive=True, min_size=100, max_size=800, target_seconds=1.0, max_mb=1000)
+    assert sizer.size('genre') == 100
+    sizer.observe('genre', rows=100, seconds=0.1, bytes_sent=10_000)
+    assert sizer.size('genre') == 200
+    # Неполная пачка (конец таблицы) не увеличивает размер.
+    sizer.observe('genre', rows=50, seconds=0.1, bytes_sent=5_000)
+    assert sizer.size('genre') == 200
+    for _ in range(5):
+        sizer.observe('genre', rows=sizer.size('genre'), seconds=0.1, bytes_sent=10_000)
+    assert sizer.size('genre') == 800
+    sizer.observe('genre', rows=800, seconds=2.0, bytes_sent=80_000)
+    assert sizer.size('genre') == 400
+    for _ in range(5):
+        sizer.observe('genre', rows=sizer.size('genre'), seconds=2.0, bytes_sent=10_000)
+    assert sizer.size('genre') == 100
+
+
+def test_batch_sizer_memory_cap():
+    sizer = BatchSizer(adaptive=True, min_size=10, max_size=100_000, target_seconds=1.0, max_mb=1)
+    sizer.sizes['film_work'] = 1000
+    # 20 КБ на строку: в 1 МБ помещается 52 строки.
+    sizer.observe('film_work', rows=1000, seconds=0.1, bytes_sent=1000 * 20_000)
+    assert sizer.size('film_work') == 2 ** 20 // 20_000
+    sizer.observe('film_work', rows=52, seconds=0.1, bytes_sent=52 * 10 ** 6)
+    assert sizer.size('film_work') == 10
+
+
+@pytest.mark.parametrize('read_size, write_size', [(100, 30), (40, 70)])
+def test_write_batches_of_exact_size(read_size, write_size):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE genre (id TEXT, name TEXT, description TEXT, created TEXT, modified TEXT)')
+    stamps = [f'2021-06-16 20:14:09.{number:06d}+00' for number in range(250)]
+    conn.executemany('INSERT INTO genre VALUES (?, ?, NULL, ?, ?)',
+                     [(str(uuid.uuid4()), f'genre {number}', stamp, stamp) for number, stamp in enumerate(stamps)])
+    sizer = BatchSizer(read_size=read_size, size=write_size)
+    tables = [('genre', dict(SQLiteLoader.tables)['genre'])]
+    batches = [batch for batch in SQLiteLoader(conn.cursor(), sizer=sizer).load_movies(tables)
+               if not batch.get('finished')]
+    assert [len(batch['data']) for batch in batches] == [write_size] * (250 // write_size) + [250 % write_size]
+    ends = [min(number * write_size, 250) for number in range(1, len(batches) + 1)]
+    assert [batch['last_rowid'] for batch in batches] == ends
+    assert [batch['last_modified'] for batch in batches] == [stamps[end - 1] for end in ends]
+
+
+def test_read_error_is_raised():
+    conn = sqlite3.connect(':memory:')
+    tables = [('genre', dict(SQLiteLoader.tables)['genre'])]
+    with pytest.raises(sqlite3.OperationalError):
+        list(SQLiteLoader(conn.cursor()).load_movies(tables))
+
+
+def test_batch_sizer_fixed_size():
+    sizer = BatchSizer(size=500, sizes={'film_work': 200})
+    sizer.observe('film_work', rows=200, seconds=0.01, bytes_sent=1000)
+    assert sizer.size('film_work') == 200
+    assert sizer.size('genre') == 500
+
+
+def test_dead_letter_file(tmp_path):
+    path = tmp_path / 'rejected.jsonl'
+    created = datetime.datetime(2021, 6, 16, tzinfo=datetime.timezone.utc)
+    row = PersonFilmWork(uuid.uuid4(), uuid.uuid4(), uuid.uuid4(), 'actor', created)
+    dead_letter = DeadLetterFile(str(path))
+    dead_letter.write('person_film_work', [(row, OrphanError('person_id отсутствует в person'))])
+    dead_letter.close()
+    [line] = path.read_text(encoding='utf-8').splitlines()
+    record = json.loads(line)
+    assert record['table'] == 'person_film_work'
+    assert record['row']['id'] == str(row.id)
+    assert record['row']['created'] == str(created)
+    assert record['error'] == 'person_id отсутствует в person'
+    assert record['sqlstate'] == '23503'
+    assert dead_letter.rejected == {'person_film_work': 1}
+
+
+@pytest.mark.parametrize('mode', ['insert', 'copy'])
+def test_bisection_rejects_check_violation(mode, tmp_path, postgres_cursor):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows = [FilmWork(uuid.uuid4(), f'bisection {number}', None, None, None, 1000.0 if number == 5 else 50.0,
+                     'movie', now, now) for number in range(8)]
+    dead_letter = DeadLetterFile(str(tmp_path / 'rejected.jsonl'))
+    metrics = MigrationMetrics()
+    saver = PostgresSaver(postgres_cursor.connection, mode=mode, metrics=metrics, dead_letter=dead_letter)
+    try:
+        assert saver.save_all_data([{'table': 'film_work', 'schema': FilmWork, 'data': rows, 'batch': 1}])
+        dead_letter.close()
+        postgres_cursor.execute("SELECT id FROM film_work WHERE id = ANY(%s)", ([row.id for row in rows],))
+        assert {record['id'] for record in postgres_cursor.fetchall()} == {row.id for row in rows} - {rows[5].id}
+        totals = metrics.tables['film_work']
+        assert (totals.rows_written, totals.rows_skipped, totals.rows_rejected) == (7, 0, 1)
+        [line] = (tmp_path / 'rejected.jsonl').read_text(encoding='utf-8').splitlines()
+        record = json.loads(line)
+        assert record['row']['id'] == str(rows[5].id)
+        assert record['sqlstate'] == '23514'
+    finally:
+        postgres_cursor.execute("DELETE FROM film_work WHERE id = ANY(%s)", ([row.id for row in rows],))
+        postgres_cursor.connection.commit()
+
+
+def test_scheduler_skips_dependents_of_failed_read(tmp_path):
+    file_name = str(tmp_path / 'broken.sqlite')
+    generate(file_name, 200)
+    with sqlite3.connect(file_name) as conn:
+        conn.execute('DROP TABLE genre')
+    loaded = []
+
+    def load_table(table, schema):
+        with open_db(file_name=file_name) as cursor:
+            batches = list(SQLiteLoader(cursor).load_movies(tables=[(table, schema)]))
+        loaded.append(table)
+        return bool(batches)
+
+    tables = SQLiteLoader.tables
+    scheduler = TableScheduler(tables, build_dependencies(tables), workers=2)
+    timings = scheduler.run(load_table)
+    assert scheduler.failed == {'genre', 'genre_film_work'}
+    assert sorted(loaded) == ['film_work', 'person', 'person_film_work']
+    assert 'genre_film_work' not in timings
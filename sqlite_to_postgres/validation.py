@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import math
+from dataclasses import fields
+from typing import Dict, Iterable, Iterator, List, Tuple
+from uuid import UUID
+
+from psycopg import connection as _connection
+from psycopg.rows import tuple_row
+
+from config import ID_INDEX_CAPACITY, ID_INDEX_ERROR_RATE
+
+ID_INDEXES = ('set', 'bloom', 'none')
+ORPHAN_MODES = ('drop', 'report')
+SEED_CHUNK = 10_000
+
+
+class OrphanError(Exception):
+    """Строка связующей таблицы ссылается на отсутствующий id родительской таблицы."""
+    sqlstate = '23503'
+
+
+class IdSet:
+    """Точный индекс id: множество 16-байтных ключей uuid.
+
+    Занимает около 85 байт на id (объект bytes и ячейка хеш-таблицы),
+    то есть примерно 85 МБ на миллион id.
+    """
+
+    def __init__(self):
+        self._keys = set()
+
+    def add(self, value: UUID) -> None:
+        self._keys.add(value.bytes)
+
+    def __contains__(self, value: UUID) -> bool:
+        return value.bytes in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class BloomIdIndex:
+    """Фильтр Блума по id для очень больших справочников.
+
+    Размер задается ожидаемым количеством id capacity и долей ложных
+    срабатываний error_rate: при 1% это около 9.6 бит (1.2 байта) на id,
+    то есть 1.2 МБ на миллион. Отсутствующий id может быть принят за
+    существующий с вероятностью error_rate, такие строки отклонит внешний
+    ключ postgres. Существующий id никогда не считается отсутствующим.
+    """
+
+    def __init__(self, capacity: int = ID_INDEX_CAPACITY, error_rate: float = ID_INDEX_ERROR_RATE):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        # blake2b дает до 64 байт, то есть не больше 16 позиций по 32 бита.
+        self.hashes = min(16, max(1, round(self.bits / capacity * math.log(2))))
+        self._array = bytearray((self.bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, value: UUID) -> List[int]:
+        # Каждая позиция - 32 бита одного хеша blake2b длиной 4 * hashes байт.
+        digest = hashlib.blake2b(value.bytes, digest_size=4 * self.hashes).digest()
+        bits = self.bits
+        return [word % bits for word in memoryview(digest).cast('I')]
+
+    def add(self, value: UUID) -> None:
+        array = self._array
+        for position in self._positions(value):
+            array[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def __contains__(self, value: UUID) -> bool:
+        array = self._array
+        for position in self._positions(value):
+            if not array[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+
+def make_index(kind: str, capacity: int = ID_INDEX_CAPACITY, error_rate: float = ID_INDEX_ERROR_RATE):
+    """Функция создает индекс id: 'set' - точный, 'bloom' - фильтр Блума на capacity id."""
+    if kind == 'set':
+        return IdSet()
+    if kind == 'bloom':
+        return BloomIdIndex(capacity, error_rate)
+    raise ValueError(f"Неизвестный индекс id: {kind}")
+
+
+def references(tables: List[Tuple[str, type]]) -> Dict[str, List[Tuple[str, str]]]:
+    """Функция находит поля *_id схем, ссылающиеся на другие таблицы: {таблица: [(поле, родитель)]}."""
+    names = {table for table, _ in tables}
+    return {
+        table: [(field.name, field.name[:-len('_id')]) for field in fields(schema)
+                if field.name.endswith('_id') and field.name[:-len('_id')] in names]
+        for table, schema in tables
+    }
+
+
+class ReferenceValidator:
+    """Проверяет ссылки связующих таблиц до записи в postgres.
+
+    Пока через загрузчик проходят родительские таблицы, их id собираются
+    в индексы (IdSet или BloomIdIndex). Строки связующих таблиц с id,
+    которого нет в индексе родителя, при orphans='drop' убираются из пачки
+    в batch['orphan_rows'], при orphans='report' только попадают в лог.
+    Убранные строки пишет в dead letter загрузчик после фиксации пачки,
+    как и отклоненные postgres: при откате и повторе пачки они не
+    попадут в файл дважды.
+    Проверка строки - обращение к индексу за O(1).
+    Индексы заполняются и уже записанными в postgres id (seed), чтобы
+    проверка работала при продолжении загрузки и с --since.
+    """
+
+    def __init__(self, tables: List[Tuple[str, type]], index: str = 'set', orphans: str = 'drop',
+                 capacity: int = ID_INDEX_CAPACITY, error_rate: float = ID_INDEX_ERROR_RATE):
+        if orphans not in ORPHAN_MODES:
+            raise ValueError(f"Неизвестная обработка строк без родителя: {orphans}")
+        self.references = {table: refs for table, refs in references(tables).items() if refs}
+        parents = {parent for refs in self.references.values() for _, parent in refs}
+        self.indexes = {parent: make_index(index, capacity, error_rate) for parent in parents}
+        self.orphans = orphans
+        self.found: Dict[str, int] = {}
+
+    def seed(self, pg_conn: _connection) -> None:
+        """Функция добавляет в индексы id, уже записанные в postgres."""
+        for parent, index in self.indexes.items():
+            with pg_conn.cursor(name=f'seed_{parent}', row_factory=tuple_row) as cursor:
+                cursor.execute(f"SELECT id FROM {parent}")
+                while rows := cursor.fetchmany(SEED_CHUNK):
+                    for row in rows:
+                        index.add(row[0])
+            pg_conn.commit()
+            if len(index):
+                logging.info(f"Индекс id {parent}: из postgres загружено {len(index)} id")
+
+    def validate(self, batches: Iterable[dict]) -> Iterator[dict]:
+        """Функция пропускает пачки загрузчика, пополняя индексы и проверяя ссылки."""
+        for batch in batches:
+            table, data = batch['table'], batch['data']
+            index = self.indexes.get(table)
+            if index is not None:
+                for row in data:
+                    index.add(row.id)
+            refs = self.references.get(table)
+            if refs and data:
+                self._check(batch, refs)
+            yield batch
+
+    def _check(self, batch: dict, refs: List[Tuple[str, str]]) -> None:
+        """Функция находит в пачке строки без родителя и убирает их при orphans='drop'."""
+        checks = [(name, parent, self.indexes[parent]) for name, parent in refs]
+        kept, orphans = [], []
+        for row in batch['data']:
+            for name, parent, index in checks:
+                value = getattr(row, name)
+                if value is not None and value not in index:
+                    orphans.append((row, OrphanError(f"{name} = {value} отсутствует в {parent}")))
+                    break
+            else:
+                kept.append(row)
+        if not orphans:
+            return
+        table = batch['table']
+        self.found[table] = self.found.get(table, 0) + len(orphans)
+        if self.orphans == 'report':
+            logging.warning(f"Таблица {table}, пачка {batch.get('batch')}: строк без родителя {len(orphans)}, "
+                            f"например {orphans[0][1]}")
+            return
+        batch['data'] = kept
+        batch['orphans'] = len(orphans)
+        batch['orphan_rows'] = orphans
+        logging.warning(f"Таблица {table}, пачка {batch.get('batch')}: отброшено строк без родителя {len(orphans)}")
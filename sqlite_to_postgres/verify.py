@@ -0,0 +1,223 @@
+"""Проверка совпадения данных в sqlite и postgres.
+
+Обе базы читаются потоково в порядке id пачками по chunk_size строк.
+Для каждой пачки sqlite считается md5 в python, а для того же диапазона id
+в postgres - md5(string_agg(...)) на стороне сервера, поэтому по сети
+передаются только хеши. Несовпавшие диапазоны можно сравнить построчно.
+
+Правила сравнения те же, что в тестах: даты и метки времени сравниваются
+по первым 10 символам (YYYY-MM-DD), uuid - в текстовом виде.
+
+Запуск из каталога sqlite_to_postgres:
+
+    python verify.py [--chunk 10000] [--rows] [--tables genre person ...]
+"""
+import argparse
+import hashlib
+import logging
+import sqlite3
+import sys
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import psycopg
+from psycopg import connection as _connection
+from psycopg.rows import tuple_row
+
+from config import dsl
+from load_data import SQLiteLoader
+
+NULL = '\\N'
+CHUNK_SIZE = 10_000
+DIFF_LIMIT = 20
+
+
+@dataclass
+class ChunkResult:
+    """Результат сравнения диапазона id. first_id=None - начало таблицы, last_id=None - конец."""
+    first_id: Optional[str]
+    last_id: Optional[str]
+    sqlite_count: int
+    postgres_count: int
+    missing: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+
+def normalize_float(value) -> str:
+    """Функция приводит число к виду, в котором его выводит postgres (7.0 -> 7)."""
+    text = repr(float(value))
+    return text[:-2] if text.endswith('.0') else text
+
+
+# Приведение значения sqlite к тексту, одинаковому с postgres.
+SQLITE_NORMALIZERS = {
+    UUID: lambda value: str(value).lower(),
+    datetime: lambda value: str(value)[:10],
+    date: lambda value: str(value)[:10],
+    float: normalize_float,
+}
+
+# Выражения postgres, дающие тот же текст.
+POSTGRES_EXPRESSIONS = {
+    UUID: "{column}::text",
+    datetime: "to_char({column} AT TIME ZONE 'UTC', 'YYYY-MM-DD')",
+    date: "to_char({column}, 'YYYY-MM-DD')",
+    float: "{column}::text",
+}
+
+
+def sqlite_row_text(schema, row: tuple) -> str:
+    """Функция собирает строку sqlite в текст для хеширования."""
+    values = []
+    for schema_field, value in zip(fields(schema), row):
+        if value is None:
+            values.append(NULL)
+        else:
+            values.append(SQLITE_NORMALIZERS.get(schema_field.type, str)(value))
+    return '\t'.join(values)
+
+
+def postgres_row_expression(schema) -> str:
+    """Функция собирает SQL-выражение, дающее тот же текст строки, что и sqlite_row_text."""
+    columns = [
+        f"coalesce({POSTGRES_EXPRESSIONS.get(schema_field.type, '{column}').format(column=schema_field.name)}, "
+        f"'{NULL}')"
+        for schema_field in fields(schema)
+    ]
+    return " || E'\\t' || ".join(columns)
+
+
+def sqlite_chunks(conn: sqlite3.Connection, table: str, schema, chunk_size: int) -> Iterator[List[tuple]]:
+    """Функция читает таблицу sqlite пачками по возрастанию id."""
+    columns = ', '.join(schema_field.name for schema_field in fields(schema))
+    cursor = conn.cursor()
+    last_id = None
+    try:
+        while True:
+            if last_id is None:
+                cursor.execute(f"SELECT {columns} FROM {table} ORDER BY id LIMIT ?", (chunk_size,))
+            else:
+                cursor.execute(f"SELECT {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                               (last_id, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+    finally:
+        cursor.close()
+
+
+def id_range(first_id: Optional[str], last_id: Optional[str]) -> Tuple[str, list]:
+    """Функция возвращает условие на диапазон id (first_id, last_id]."""
+    conditions, params = [], []
+    if first_id is not None:
+        conditions.append("id > %s")
+        params.append(first_id)
+    if last_id is not None:
+        conditions.append("id <= %s")
+        params.append(last_id)
+    return ' AND '.join(conditions) or 'TRUE', params
+
+
+def postgres_digest(cursor: psycopg.cursor, table: str, schema, first_id: Optional[str],
+                    last_id: Optional[str]) -> Tuple[int, str]:
+    """Функция считает количество строк и md5 диапазона id на стороне postgres."""
+    where, params = id_range(first_id, last_id)
+    cursor.execute(
+        f"SELECT count(*), md5(coalesce(string_agg({postgres_row_expression(schema)}, E'\\n' ORDER BY id), '')) "
+        f"FROM {table} WHERE {where}",
+        params,
+    )
+    count, digest = cursor.fetchone()
+    return count, digest
+
+
+def postgres_rows(cursor: psycopg.cursor, table: str, schema, first_id: Optional[str],
+                  last_id: Optional[str]) -> dict:
+    """Функция возвращает тексты строк диапазона id из postgres."""
+    where, params = id_range(first_id, last_id)
+    cursor.execute(f"SELECT id::text, {postgres_row_expression(schema)} FROM {table} WHERE {where}", params)
+    return dict(cursor.fetchall())
+
+
+def diff_rows(result: ChunkResult, sqlite_texts: dict, postgres_texts: dict) -> None:
+    """Функция находит в диапазоне отсутствующие, лишние и отличающиеся строки."""
+    result.missing = sorted(set(sqlite_texts) - set(postgres_texts))[:DIFF_LIMIT]
+    result.extra = sorted(set(postgres_texts) - set(sqlite_texts))[:DIFF_LIMIT]
+    result.changed = sorted(row_id for row_id, text in sqlite_texts.items()
+                            if row_id in postgres_texts and postgres_texts[row_id] != text)[:DIFF_LIMIT]
+
+
+def verify_table(sqlite_conn: sqlite3.Connection, pg_conn: _connection, table: str, schema,
+                 chunk_size: int = CHUNK_SIZE, rows: bool = False) -> List[ChunkResult]:
+    """Функция сравнивает таблицу в sqlite и postgres и возвращает несовпавшие диапазоны id.
+
+    При rows=True для несовпавших диапазонов дополнительно ищутся
+    конкретные строки.
+    """
+    mismatches = []
+    previous_id = None
+    with pg_conn.cursor(row_factory=tuple_row) as cursor:
+        for chunk in sqlite_chunks(sqlite_conn, table, schema, chunk_size):
+            texts = {str(row[0]).lower(): sqlite_row_text(schema, row) for row in chunk}
+            digest = hashlib.md5('\n'.join(texts.values()).encode('utf-8')).hexdigest()
+            last_id = chunk[-1][0]
+            count, postgres_md5 = postgres_digest(cursor, table, schema, previous_id, last_id)
+            if count != len(chunk) or postgres_md5 != digest:
+                result = ChunkResult(previous_id, last_id, len(chunk), count)
+                if rows:
+                    diff_rows(result, texts, postgres_rows(cursor, table, schema, previous_id, last_id))
+                mismatches.append(result)
+            previous_id = last_id
+
+        count, _ = postgres_digest(cursor, table, schema, previous_id, None)
+        if count:
+            result = ChunkResult(previous_id, None, 0, count)
+            if rows:
+                diff_rows(result, {}, postgres_rows(cursor, table, schema, previous_id, None))
+            mismatches.append(result)
+    pg_conn.commit()
+    return mismatches
+
+
+def print_report(table: str, mismatches: List[ChunkResult]) -> None:
+    if not mismatches:
+        print(f"{table}: OK")
+        return
+    print(f"{table}: несовпавших диапазонов - {len(mismatches)}")
+    for result in mismatches:
+        print(f"  ({result.first_id or '-'}, {result.last_id or '-'}]: "
+              f"sqlite {result.sqlite_count}, postgres {result.postgres_count}")
+        for title, ids in (('нет в postgres', result.missing), ('лишние в postgres', result.extra),
+                           ('отличаются', result.changed)):
+            if ids:
+                print(f"    {title}: {', '.join(ids)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение данных sqlite и postgres.')
+    parser.add_argument('--db', default='db.sqlite', help='база sqlite')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='строк в сравниваемой пачке')
+    parser.add_argument('--rows', action='store_true', help='искать отличающиеся строки в несовпавших пачках')
+    parser.add_argument('--tables', nargs='*', help='проверяемые таблицы, по умолчанию все')
+    args = parser.parse_args()
+
+    tables = [(table, schema) for table, schema in SQLiteLoader.tables
+              if not args.tables or table in args.tables]
+    failed = False
+    with sqlite3.connect(args.db) as sqlite_conn, psycopg.connect(**dsl) as pg_conn:
+        for table, schema in tables:
+            mismatches = verify_table(sqlite_conn, pg_conn, table, schema, chunk_size=args.chunk, rows=args.rows)
+            print_report(table, mismatches)
+            if mismatches:
+                logging.error(f"Данные таблицы {table} не совпадают: {len(mismatches)} диапазонов")
+            failed = failed or bool(mismatches)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()